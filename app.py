@@ -5,13 +5,17 @@ May Allah grant success to this project
 """
 
 import streamlit as st
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta, time, timezone
 import json
-import os
-from bitquery_client import BitqueryClient
-from processor import TokenProcessor
+import time as time_module
+from cache import SharedCache, config_hash
+from jobs import JobManager, run_tracker
+from store import TokenStore, CATEGORIES, SORT_COLUMNS, parse_time
 import config
 
+# pandas, numpy (charts, archive), rollups and altair are imported by the
+# functions that draw with them, so plain reruns never load them
+
 # Page config
 st.set_page_config(
     page_title="Solana Memecoin Tracker",
@@ -59,6 +63,45 @@ def check_password():
 if not check_password():
     st.stop()
 
+# Process-wide caches, shared by every session of this server
+@st.cache_resource
+def get_api_cache():
+    """API results shared by all clients; identical in-flight queries coalesce"""
+    return SharedCache()
+
+@st.cache_resource
+def get_store():
+    """Indexed token store behind the History tab"""
+    return TokenStore()
+
+@st.cache_resource
+def get_job_manager():
+    """Background runs keyed by date, window and config hash"""
+    return JobManager()
+
+@st.cache_resource
+def get_presets():
+    """TIME_RANGE_PRESETS with their times parsed once per server"""
+    return {
+        name: (
+            datetime.strptime(preset['start'], "%H:%M:%S").time() if preset['start'] else None,
+            datetime.strptime(preset['end'], "%H:%M:%S").time() if preset['end'] else None,
+        )
+        for name, preset in config.TIME_RANGE_PRESETS.items()
+    }
+
+@st.cache_resource
+def get_rollups():
+    """Hourly / daily counters behind the Trends tab"""
+    from rollups import RollupStore
+    return RollupStore()
+
+@st.cache_resource
+def get_archive():
+    """Memory-mapped trade archive behind the token drill-down"""
+    from archive import TradeArchive
+    return TradeArchive()
+
 # Custom CSS for mobile responsiveness
 st.markdown("""
 <style>
@@ -119,11 +162,8 @@ with st.sidebar:
         with col2:
             end_time = st.time_input("To (UTC)", value=time(23, 59, 59))
     else:
-        start_time_str = preset_config['start']
-        end_time_str = preset_config['end']
-        start_time = datetime.strptime(start_time_str, "%H:%M:%S").time()
-        end_time = datetime.strptime(end_time_str, "%H:%M:%S").time()
-        st.info(f"⏰ {start_time_str} to {end_time_str} UTC")
+        start_time, end_time = get_presets()[preset]
+        st.info(f"⏰ {preset_config['start']} to {preset_config['end']} UTC")
     
     # Combine date and time
     start_datetime = datetime.combine(selected_date, start_time)
@@ -148,10 +188,20 @@ with st.sidebar:
     st.markdown("""
     - **Pump & Dump:** Pumped to $15K-$100K, tanked 80%+
     - **Rug Pull:** Liquidity pulled (<$5K)
+    - **Dev Dump:** Creator sold 50%+ of their tokens
     """)
     
     st.markdown("---")
     
+    # Profiling (opt-in)
+    profile_run = st.checkbox(
+        "🔬 Profile this run",
+        value=config.PROFILING_CONFIG['enabled'],
+        help="Capture a CPU profile and per-token timings (written next to the JSON files)"
+    )
+    
+    st.markdown("---")
+    
     # API Key
     bitquery_token = st.text_input(
         "Bitquery API Token",
@@ -165,223 +215,567 @@ with st.sidebar:
     st.caption("الحمد لله")
 
 # Main area
-st.markdown("---")
+def render_no_tokens(summary):
+    """Shown when a run found nothing to analyze"""
+    st.warning("⚠️ No tokens found in this time range!")
+    
+    if 'warning' in summary:
+        st.info(summary['warning'])
+    
+    st.markdown("""
+    ### 🔧 Troubleshooting:
+    
+    1. **Try a different date:**
+       - Bitquery free tier may have 24-48h delay
+       - Try dates from **2-3 days ago**
+    
+    2. **Check your time range:**
+       - Use "Prime Time (14:00-22:00 UTC)" preset
+       - Most tokens launch during these hours
+    
+    3. **Verify Bitquery token:**
+       - Make sure your API token is valid
+       - Test it at https://graphql.bitquery.io/ide
+    
+    4. **Check Bitquery status:**
+       - API might be temporarily down
+       - Try again in 5-10 minutes
+    """)
 
-col1, col2, col3 = st.columns([1, 2, 1])
 
-with col2:
-    st.markdown(f"""
-    ### 📍 Selected Time Range
-    **Date:** {selected_date.strftime('%Y-%m-%d')}  
-    **From:** {start_datetime.strftime('%H:%M:%S')} UTC  
-    **To:** {end_datetime.strftime('%H:%M:%S')} UTC  
-    **Tracking Duration:** {tracking_hours} hours per token
-    """)
+def render_results(successful, failed, summary, downloads, date_label):
+    """Summary report, downloads and preview of a finished run"""
+    summary_bytes, successful_bytes, failed_bytes = downloads
     
-    # The magic button
-    if st.button("🔥 RUN TRACKER", use_container_width=True, type="primary"):
-        
-        if not bitquery_token:
-            st.error("❌ Please enter your Bitquery API token in the sidebar")
-            st.info("👉 Get your free token at: https://graphql.bitquery.io")
+    st.success("✅ Processing complete! الحمد لله")
+    
+    # Display summary
+    st.markdown("---")
+    st.subheader("📊 Summary Report")
+    
+    # Summary metrics
+    col_metric1, col_metric2, col_metric3 = st.columns(3)
+    
+    with col_metric1:
+        st.metric(
+            "Total Tokens Analyzed",
+            summary['total_tokens_analyzed']
+        )
+    
+    with col_metric2:
+        success_rate = (summary['successful_tokens']['total'] / max(summary['total_tokens_analyzed'], 1) * 100)
+        st.metric(
+            "✅ Successful",
+            summary['successful_tokens']['total'],
+            delta=f"{success_rate:.1f}% success rate"
+        )
+    
+    with col_metric3:
+        failure_rate = (summary['failed_tokens']['total'] / max(summary['total_tokens_analyzed'], 1) * 100)
+        st.metric(
+            "❌ Failed",
+            summary['failed_tokens']['total'],
+            delta=f"{failure_rate:.1f}% failure rate"
+        )
+    
+    # Detailed breakdown
+    st.markdown("---")
+    col_detail1, col_detail2 = st.columns(2)
+    
+    with col_detail1:
+        st.markdown("#### ✅ Successful Breakdown")
+        # Get dynamic keys from summary
+        breakdown = summary['successful_tokens']['breakdown']
+        roi_keys = list(breakdown.keys())
+        st.markdown(f"""
+        **📈 ROI Distribution:**
+        - **{roi_keys[0]}:** {breakdown[roi_keys[0]]} tokens
+        - **{roi_keys[1]}:** {breakdown[roi_keys[1]]} tokens
+        """)
+    
+    with col_detail2:
+        st.markdown("#### ❌ Failed Breakdown")
+        st.markdown(f"""
+        **💥 Failure Types:**
+        - **Pump & Dump:** {summary['failed_tokens']['breakdown']['pump_and_dump']} tokens
+        - **Rug Pull:** {summary['failed_tokens']['breakdown']['rug_pull']} tokens
+        - **Dev Dump:** {summary['failed_tokens']['breakdown'].get('dev_dump', 0)} tokens
+        """)
+
+    # API point spend
+    if 'api_points' in summary:
+        points = summary['api_points']
+        caption = f"🧮 API points: {points['spent']:,.0f} this run"
+        if points['daily_limit']:
+            caption += f" · {points['daily_spent']:,.0f} / {points['daily_limit']:,} today"
+        dropped = summary.get('query_plan', {}).get('dropped_over_budget')
+        if dropped:
+            caption += f" · {dropped} tokens skipped (over budget)"
+        st.caption(caption)
+
+    # Profiling results
+    if 'profiling' in summary:
+        with st.expander("🔬 Slowest Tokens"):
+            st.caption(f"CPU profile: {summary['profiling']['cpu_profile']}")
+            st.table([
+                {
+                    "Token": t['token_address'],
+                    "Seconds": t['total_seconds'],
+                    "Reason": t['reason']
+                }
+                for t in summary['profiling']['slowest_tokens']
+            ])
+    
+    # Download section
+    st.markdown("---")
+    st.subheader("📥 Download JSON Files")
+    
+    col_dl1, col_dl2, col_dl3 = st.columns(3)
+    
+    with col_dl1:
+        st.markdown("##### 📊 Summary")
+        st.download_button(
+            "📥 Download Summary",
+            summary_bytes,
+            file_name=f"summary_{date_label}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+    
+    with col_dl2:
+        st.markdown("##### ✅ Successful")
+        if successful:
+            st.download_button(
+                "📥 Download Successful",
+                successful_bytes,
+                file_name=f"successful_tokens_{date_label}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+            st.caption(f"{len(successful)} tokens")
+        else:
+            st.info("No successful tokens")
+    
+    with col_dl3:
+        st.markdown("##### ❌ Failed")
+        if failed:
+            st.download_button(
+                "📥 Download Failed",
+                failed_bytes,
+                file_name=f"failed_tokens_{date_label}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+            st.caption(f"{len(failed)} tokens")
+        else:
+            st.info("No failed tokens")
+    
+    # Preview
+    st.markdown("---")
+    st.subheader("👀 Preview (First 3 Tokens)")
+    
+    col_prev1, col_prev2 = st.columns(2)
+    
+    with col_prev1:
+        st.markdown("#### ✅ Successful")
+        if successful:
+            st.json(successful[:3])
         else:
-            # Progress containers
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            st.info("No tokens to preview")
+    
+    with col_prev2:
+        st.markdown("#### ❌ Failed")
+        if failed:
+            st.json(failed[:3])
+        else:
+            st.info("No tokens to preview")
+    
+    render_token_chart(successful, failed, date_label)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_chart_series(token_address, offset, points):
+    """Downsampled MC series of one token (offset keys the cache to the archived segment)"""
+    import pandas as pd
+    import charts
+    
+    entry = get_archive().lookup(token_address)
+    series = charts.mc_series(get_archive(), entry, points) if entry else None
+    if series is None:
+        return None
+    times, mcs = series
+    return pd.DataFrame({"time": pd.to_datetime(times, unit="s", utc=True), "market_cap": mcs})
+
+
+def render_token_chart(successful, failed, date_label):
+    """Drill-down: market cap over time of one classified token"""
+    if not config.ARCHIVE_CONFIG['enabled']:
+        return
+    
+    st.markdown("---")
+    st.subheader("📈 Token Drill-Down")
+    
+    options = [f"✅ {t['token_address']}" for t in successful] + [f"❌ {t['token_address']}" for t in failed]
+    if not options:
+        st.info("No classified tokens to chart")
+        return
+    
+    choice = st.selectbox("Token", options, key=f"chart_token_{date_label}")
+    token_address = choice.split(" ", 1)[1]
+    
+    entry = get_archive().lookup(token_address)
+    series = load_chart_series(token_address, entry['offset'], config.CHARTS_CONFIG['max_points']) if entry else None
+    if series is None:
+        st.info("No trade series archived for this token")
+        return
+    
+    import altair as alt
+    import pandas as pd
+    import charts
+    
+    markers = charts.markers(entry)
+    marker_rows = [
+        {"time": pd.Timestamp(parse_time(value)), "marker": name.replace('_time', '')}
+        for name, value in markers.items() if value
+    ]
+    
+    line = alt.Chart(series).mark_line().encode(
+        x=alt.X("time:T", title="Time (UTC)"),
+        y=alt.Y("market_cap:Q", title="Market cap (USD)"),
+        tooltip=["time:T", alt.Tooltip("market_cap:Q", format=",.0f")]
+    )
+    rules = alt.Chart(pd.DataFrame(marker_rows)).mark_rule(strokeDash=[4, 4]).encode(
+        x="time:T",
+        color=alt.Color("marker:N", title="Marker"),
+        tooltip=["marker:N", "time:T"]
+    )
+    st.altair_chart(line + rules if marker_rows else line, use_container_width=True)
+    st.caption(f"{len(series)} points (LTTB downsampled)")
+
+
+def render_live(snapshot):
+    """Progress, counters and tokens classified so far"""
+    current, total, message = snapshot['progress']
+    st.progress(current / total if total else 0)
+    st.text(f"⏳ {message}")
+    
+    col_live1, col_live2, col_live3 = st.columns(3)
+    with col_live1:
+        st.metric("Processed", f"{current}/{total}" if total else "-")
+    with col_live2:
+        st.metric("✅ Successful so far", len(snapshot['successful']))
+    with col_live3:
+        st.metric("❌ Failed so far", len(snapshot['failed']))
+    
+    col_prev1, col_prev2 = st.columns(2)
+    with col_prev1:
+        st.markdown("#### ✅ Successful")
+        if snapshot['successful']:
+            st.dataframe(snapshot['successful'], use_container_width=True)
+        else:
+            st.info("No successful tokens yet")
+    with col_prev2:
+        st.markdown("#### ❌ Failed")
+        if snapshot['failed']:
+            st.dataframe(snapshot['failed'], use_container_width=True)
+        else:
+            st.info("No failed tokens yet")
+    
+    st.caption(f"Running for {snapshot['elapsed']:.0f}s - you can leave this page, the run continues")
+
+
+def render_history():
+    """Cross-date queries over the token store"""
+    st.markdown("### 📚 Token History")
+    st.caption("Every saved run is indexed here - no need to re-run the tracker")
+    
+    col_h1, col_h2 = st.columns(2)
+    with col_h1:
+        date_range = st.date_input(
+            "Launch dates",
+            value=(datetime.now() - timedelta(days=30), datetime.now()),
+            key="history_dates"
+        )
+        hours = st.slider("Launch hour (UTC)", 0, 23, (0, 23), key="history_hours")
+        categories = st.multiselect("Categories", CATEGORIES, default=['successful'], key="history_categories")
+    with col_h2:
+        min_roi = st.number_input("Min ROI (x)", min_value=0.0, value=0.0, key="history_min_roi")
+        min_peak_mc = st.number_input("Min Peak MC ($)", min_value=0, value=0, step=10000, key="history_min_peak")
+        sort_by = st.selectbox("Sort by", list(SORT_COLUMNS.keys()), index=2, key="history_sort")
+        limit = st.number_input("Top N", min_value=1, max_value=10000, value=100, key="history_limit")
+    
+    if len(date_range) != 2:
+        st.info("Select a start and end date")
+        return
+    
+    started = time_module.perf_counter()
+    rows = get_store().query(
+        start=datetime.combine(date_range[0], time(0, 0, 0)),
+        end=datetime.combine(date_range[1], time(23, 59, 59)),
+        categories=categories,
+        hour_from=hours[0],
+        hour_to=hours[1],
+        min_roi=min_roi or None,
+        min_peak_mc=min_peak_mc or None,
+        order_by=sort_by,
+        descending=sort_by != 'launch_time',
+        limit=limit
+    )
+    elapsed_ms = (time_module.perf_counter() - started) * 1000
+    
+    st.caption(f"{len(rows)} tokens in {elapsed_ms:.1f} ms")
+    if rows:
+        st.dataframe(
+            [
+                {
+                    "Token": t['token_address'],
+                    "Launch": t['launch_time'],
+                    "Category": t['category'],
+                    "Launch MC": int(t.get('launch_mc') or 0),
+                    "Peak MC": int(t.get('peak_mc') or 0),
+                    "ROI": round(t.get('roi_from_entry_end') or 0, 1),
+                    "Tank %": round(t.get('tank_percentage') or 0, 1),
+                }
+                for t in rows
+            ],
+            use_container_width=True
+        )
+    else:
+        st.info("No stored tokens match these filters")
+
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def _rates(frame):
+    """Success rate % of the enriched tokens next to the counts"""
+    frame['success_rate'] = (frame['successful'] / frame['enriched'].where(frame['enriched'] > 0) * 100).fillna(0)
+    return frame
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_trends(start_date, end_date, version):
+    """Trend tables from the rollup counters (version keys the cache to the last save)"""
+    import pandas as pd
+    from rollups import roi_labels, peak_mc_labels
+    
+    start = datetime.combine(start_date, time(0, 0, 0))
+    end = datetime.combine(end_date, time(23, 59, 59))
+    rollups = get_rollups()
+    
+    daily = rollups.series('day', start, end)
+    days = pd.date_range(start_date, end_date, freq='D', tz='UTC')
+    frame = pd.DataFrame({
+        'date': days,
+        'enriched': [daily.get(int(day.timestamp()), {}).get('enriched', 0) for day in days],
+        'successful': [daily.get(int(day.timestamp()), {}).get('category:successful', 0) for day in days],
+    })
+    # Rolling rates weigh days by their enriched tokens, not a mean of daily rates
+    for window in (7, 30):
+        enriched = frame['enriched'].rolling(window, min_periods=1).sum()
+        frame[f'rate_{window}d'] = (frame['successful'].rolling(window, min_periods=1).sum() /
+                                    enriched.where(enriched > 0) * 100)
+    frame = _rates(frame)
+    
+    categories = pd.DataFrame([
+        {'date': pd.Timestamp(ts, unit='s', tz='UTC'), 'category': metric.split(':', 1)[1], 'tokens': value}
+        for ts, metrics in daily.items() for metric, value in metrics.items() if metric.startswith('category:')
+    ])
+    
+    profiles = {}
+    for by, labels in (('hour', [f"{h:02d}" for h in range(24)]), ('weekday', WEEKDAYS)):
+        counts = rollups.profile(by, start, end)
+        profiles[by] = _rates(pd.DataFrame({
+            'slot': labels,
+            'enriched': [counts.get(i, {}).get('enriched', 0) for i in range(len(labels))],
+            'successful': [counts.get(i, {}).get('category:successful', 0) for i in range(len(labels))],
+        }))
+    
+    totals = {}
+    for metrics in daily.values():
+        for metric, value in metrics.items():
+            totals[metric] = totals.get(metric, 0) + value
+    histograms = {
+        prefix: pd.DataFrame({'bucket': labels, 'tokens': [totals.get(f"{prefix}:{label}", 0) for label in labels]})
+        for prefix, labels in (('roi', roi_labels()), ('peak_mc', peak_mc_labels()))
+    }
+    flags = {name: totals.get(f"flag:{name}", 0) for name in ('pump_and_dump', 'rug_pull', 'dev_dump')}
+    
+    return frame, categories, profiles, histograms, flags
+
+
+def _bar(frame, x, y, title, sort=None):
+    import altair as alt
+    return alt.Chart(frame).mark_bar().encode(
+        x=alt.X(f"{x}:N", sort=sort, title=None),
+        y=alt.Y(f"{y}:Q", title=title),
+        tooltip=[x, y]
+    )
+
+
+def render_trends():
+    """Multi-day trends from the pre-aggregated rollup counters"""
+    st.markdown("### 📈 Trends")
+    st.caption("Hourly and daily counters, updated every time a run is saved")
+    
+    date_range = st.date_input(
+        "Launch dates",
+        value=(datetime.now() - timedelta(days=90), datetime.now()),
+        key="trend_dates"
+    )
+    if len(date_range) != 2:
+        st.info("Select a start and end date")
+        return
+    
+    started = time_module.perf_counter()
+    daily, categories, profiles, histograms, flags = load_trends(*date_range, get_rollups().version())
+    elapsed_ms = (time_module.perf_counter() - started) * 1000
+    
+    total = int(daily['enriched'].sum())
+    if not total:
+        st.info("No saved runs in this range yet")
+        return
+    
+    col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+    col_t1.metric("Enriched tokens", f"{total:,}")
+    col_t2.metric("Success rate", f"{daily['successful'].sum() / total * 100:.1f}%")
+    col_t3.metric("Pump & dumps", f"{flags['pump_and_dump']:,}")
+    col_t4.metric("Rug pulls", f"{flags['rug_pull']:,}")
+    
+    import altair as alt
+    from rollups import roi_labels, peak_mc_labels
+    
+    st.markdown("#### Success rate by day")
+    rates = daily.melt(
+        id_vars='date', value_vars=['success_rate', 'rate_7d', 'rate_30d'], var_name='series', value_name='rate'
+    )
+    st.altair_chart(
+        alt.Chart(rates).mark_line().encode(
+            x=alt.X("date:T", title=None),
+            y=alt.Y("rate:Q", title="Success rate (%)"),
+            color=alt.Color("series:N", title=None),
+            tooltip=["date:T", "series:N", alt.Tooltip("rate:Q", format=".1f")]
+        ),
+        use_container_width=True
+    )
+    
+    if not categories.empty:
+        st.markdown("#### Tokens by category")
+        st.altair_chart(
+            alt.Chart(categories).mark_bar().encode(
+                x=alt.X("date:T", title=None),
+                y=alt.Y("tokens:Q", title="Tokens"),
+                color=alt.Color("category:N", title=None),
+                tooltip=["date:T", "category:N", "tokens:Q"]
+            ),
+            use_container_width=True
+        )
+    
+    col_p1, col_p2 = st.columns(2)
+    with col_p1:
+        st.markdown("#### By launch hour (UTC)")
+        st.altair_chart(_bar(profiles['hour'], 'slot', 'success_rate', "Success rate (%)"), use_container_width=True)
+    with col_p2:
+        st.markdown("#### By weekday")
+        st.altair_chart(_bar(profiles['weekday'], 'slot', 'success_rate', "Success rate (%)", WEEKDAYS),
+                        use_container_width=True)
+    
+    col_p3, col_p4 = st.columns(2)
+    with col_p3:
+        st.markdown("#### ROI from entry end")
+        st.altair_chart(_bar(histograms['roi'], 'bucket', 'tokens', "Tokens", roi_labels()), use_container_width=True)
+    with col_p4:
+        st.markdown("#### Peak market cap")
+        st.altair_chart(_bar(histograms['peak_mc'], 'bucket', 'tokens', "Tokens", peak_mc_labels()),
+                        use_container_width=True)
+    
+    st.caption(f"{len(daily)} days loaded in {elapsed_ms:.1f} ms")
+
+
+poll_job = False     # Rerun at the end of the script while a job is running
+
+tab_tracker, tab_history, tab_trends = st.tabs(["🔥 Tracker", "📚 History", "📈 Trends"])
+
+with tab_tracker:
+    st.markdown("---")
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+
+    with col2:
+        st.markdown(f"""
+        ### 📍 Selected Time Range
+        **Date:** {selected_date.strftime('%Y-%m-%d')}  
+        **From:** {start_datetime.strftime('%H:%M:%S')} UTC  
+        **To:** {end_datetime.strftime('%H:%M:%S')} UTC  
+        **Tracking Duration:** {tracking_hours} hours per token
+        """)
+        
+        # The magic button
+        if st.button("🔥 RUN TRACKER", use_container_width=True, type="primary"):
             
-            try:
-                # Initialize clients
-                status_text.text("🔧 Initializing Bitquery client...")
-                bitquery = BitqueryClient(bitquery_token)
-                processor = TokenProcessor(bitquery)
-                
-                # Progress callback
-                def update_progress(current, total, message):
-                    progress_bar.progress(current / total)
-                    status_text.text(f"⏳ {message}")
-                
-                # Process tokens
-                status_text.text("🔍 Fetching token launches from Bitquery...")
-                
-                successful, failed, summary = processor.process_tokens_for_timerange(
-                    start_datetime,
-                    end_datetime,
-                    progress_callback=update_progress
-                )
-                
-                # Clear progress indicators
-                progress_bar.empty()
-                status_text.empty()
-                
-                # Check if any tokens were found
-                if summary.get('total_tokens_analyzed', 0) == 0:
-                    st.warning("⚠️ No tokens found in this time range!")
-                    
-                    if 'warning' in summary:
-                        st.info(summary['warning'])
-                    
-                    st.markdown("""
-                    ### 🔧 Troubleshooting:
-                    
-                    1. **Try a different date:**
-                       - Bitquery free tier may have 24-48h delay
-                       - Try dates from **2-3 days ago**
-                    
-                    2. **Check your time range:**
-                       - Use "Prime Time (14:00-22:00 UTC)" preset
-                       - Most tokens launch during these hours
-                    
-                    3. **Verify Bitquery token:**
-                       - Make sure your API token is valid
-                       - Test it at https://graphql.bitquery.io/ide
-                    
-                    4. **Check Bitquery status:**
-                       - API might be temporarily down
-                       - Try again in 5-10 minutes
-                    """)
-                    st.stop()
-                
-                # Generate date label
+            if not bitquery_token and config.TRANSPORT_CONFIG['mode'] != 'replay':
+                st.error("❌ Please enter your Bitquery API token in the sidebar")
+                st.info("👉 Get your free token at: https://graphql.bitquery.io")
+            else:
+                # Submit to the background executor; identical runs (same window
+                # and config) started from any session attach to the same job
                 date_label = selected_date.strftime(config.DATE_FORMAT)
-                
-                # Save to files
-                status_text.text("💾 Saving JSON files...")
-                summary_file, successful_file, failed_file = processor.save_to_json_files(
-                    successful,
-                    failed,
-                    summary,
-                    date_label
+                run_key = (start_datetime.isoformat(), end_datetime.isoformat(), config_hash(), profile_run)
+                # Resolved here: cached resources need the script thread's context
+                api_cache = get_api_cache()
+                # Last launch's tracking window closes tracking_hours after the range ends
+                final_at = (end_datetime.replace(tzinfo=timezone.utc) + timedelta(hours=tracking_hours)).timestamp()
+                job = get_job_manager().submit(
+                    run_key,
+                    lambda job: run_tracker(
+                        job,
+                        bitquery_token,
+                        api_cache,
+                        start_datetime,
+                        end_datetime,
+                        date_label,
+                        profile=profile_run
+                    ),
+                    final_at=final_at
                 )
-                
-                st.success("✅ Processing complete! الحمد لله")
-                
-                # Display summary
-                st.markdown("---")
-                st.subheader("📊 Summary Report")
-                
-                # Summary metrics
-                col_metric1, col_metric2, col_metric3 = st.columns(3)
-                
-                with col_metric1:
-                    st.metric(
-                        "Total Tokens Analyzed",
-                        summary['total_tokens_analyzed']
-                    )
-                
-                with col_metric2:
-                    success_rate = (summary['successful_tokens']['total'] / max(summary['total_tokens_analyzed'], 1) * 100)
-                    st.metric(
-                        "✅ Successful",
-                        summary['successful_tokens']['total'],
-                        delta=f"{success_rate:.1f}% success rate"
-                    )
-                
-                with col_metric3:
-                    failure_rate = (summary['failed_tokens']['total'] / max(summary['total_tokens_analyzed'], 1) * 100)
-                    st.metric(
-                        "❌ Failed",
-                        summary['failed_tokens']['total'],
-                        delta=f"{failure_rate:.1f}% failure rate"
-                    )
-                
-                # Detailed breakdown
-                st.markdown("---")
-                col_detail1, col_detail2 = st.columns(2)
-                
-                with col_detail1:
-                    st.markdown("#### ✅ Successful Breakdown")
-                    # Get dynamic keys from summary
-                    breakdown = summary['successful_tokens']['breakdown']
-                    roi_keys = list(breakdown.keys())
-                    st.markdown(f"""
-                    **📈 ROI Distribution:**
-                    - **{roi_keys[0]}:** {breakdown[roi_keys[0]]} tokens
-                    - **{roi_keys[1]}:** {breakdown[roi_keys[1]]} tokens
-                    """)
-                
-                with col_detail2:
-                    st.markdown("#### ❌ Failed Breakdown")
-                    st.markdown(f"""
-                    **💥 Failure Types:**
-                    - **Pump & Dump:** {summary['failed_tokens']['breakdown']['pump_and_dump']} tokens
-                    - **Rug Pull:** {summary['failed_tokens']['breakdown']['rug_pull']} tokens
-                    """)
-                
-                # Download section
-                st.markdown("---")
-                st.subheader("📥 Download JSON Files")
-                
-                col_dl1, col_dl2, col_dl3 = st.columns(3)
-                
-                with col_dl1:
-                    st.markdown("##### 📊 Summary")
-                    with open(summary_file, 'r') as f:
-                        st.download_button(
-                            "📥 Download Summary",
-                            f.read(),
-                            file_name=f"summary_{date_label}.json",
-                            mime="application/json",
-                            use_container_width=True
-                        )
-                
-                with col_dl2:
-                    st.markdown("##### ✅ Successful")
-                    if successful:
-                        with open(successful_file, 'r') as f:
-                            st.download_button(
-                                "📥 Download Successful",
-                                f.read(),
-                                file_name=f"successful_tokens_{date_label}.json",
-                                mime="application/json",
-                                use_container_width=True
-                            )
-                        st.caption(f"{len(successful)} tokens")
-                    else:
-                        st.info("No successful tokens")
-                
-                with col_dl3:
-                    st.markdown("##### ❌ Failed")
-                    if failed:
-                        with open(failed_file, 'r') as f:
-                            st.download_button(
-                                "📥 Download Failed",
-                                f.read(),
-                                file_name=f"failed_tokens_{date_label}.json",
-                                mime="application/json",
-                                use_container_width=True
-                            )
-                        st.caption(f"{len(failed)} tokens")
-                    else:
-                        st.info("No failed tokens")
-                
-                # Preview
-                st.markdown("---")
-                st.subheader("👀 Preview (First 3 Tokens)")
-                
-                col_prev1, col_prev2 = st.columns(2)
-                
-                with col_prev1:
-                    st.markdown("#### ✅ Successful")
-                    if successful:
-                        st.json(successful[:3])
-                    else:
-                        st.info("No tokens to preview")
-                
-                with col_prev2:
-                    st.markdown("#### ❌ Failed")
-                    if failed:
-                        st.json(failed[:3])
-                    else:
-                        st.info("No tokens to preview")
-                
-            except Exception as e:
-                progress_bar.empty()
-                status_text.empty()
-                
-                st.error(f"❌ Error: {str(e)}")
+                st.session_state["job_id"] = job.id
+        
+        # Poll the current job
+        job = get_job_manager().get(st.session_state.get("job_id"))
+        
+        if job is not None:
+            snapshot = job.snapshot()
+            
+            if job.active:
+                render_live(snapshot)
+                poll_job = True
+            
+            elif snapshot['status'] == 'error':
+                st.error(f"❌ Error: {snapshot['error']}")
                 st.error("Full error details:")
-                st.code(str(e))
+                st.code(snapshot['error'])
+            
+            else:
+                successful, failed, summary, downloads, date_label = snapshot['result']
+                
+                if downloads is None:
+                    render_no_tokens(summary)
+                else:
+                    render_results(successful, failed, summary, downloads, date_label)
+
+with tab_history:
+    render_history()
+
+with tab_trends:
+    render_trends()
+
 
 # Footer
 st.markdown("---")
 st.caption("🚀 Solana Memecoin Tracker | 🤲 الحمد لله رب العالمين")
+
+# Refresh a running job only after every tab has rendered, so History and
+# Trends stay usable while it runs
+if poll_job:
+    time_module.sleep(config.JOBS_CONFIG['poll_seconds'])
+    st.rerun()
@@ -0,0 +1,278 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Trade Archive - Append-only, memory-mapped store of every token's trades
+OUTPUT_DIR/archive/trades.bin holds one segment per token fetch: fixed-width
+columns stored back to back (ts, price, side_usd, trader, side). The SQLite
+index maps each mint to its latest segment. Readers mmap the file and get
+numpy views straight into it, so scanning months of histories costs disk
+reads, not Python objects.
+Refetching an open window whose trade count has not changed writes
+nothing; segments replaced by later fetches stay in the file until
+compact() rewrites it (run it while no other process reads the archive).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+import numpy as np
+import config
+from db import connect, create
+from features import TradeRow
+from store import parse_time
+
+# Column layout of a segment; 8-byte columns first keeps every column aligned
+COLUMNS = [
+    ('ts', np.float64),         # Unix seconds
+    ('price', np.float64),      # PriceInUSD
+    ('side_usd', np.float64),   # Side AmountInUSD (NaN when missing)
+    ('trader', np.uint64),      # Stable hash of Account.Owner (0 when missing)
+    ('side', np.int8),          # 1 buy, -1 sell, 0 unknown
+]
+
+SIDES = {'buy': 1, 'sell': -1}
+SIDE_NAMES = {1: 'buy', -1: 'sell'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    token_address TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    complete INTEGER NOT NULL,
+    meta TEXT,
+    written_at REAL NOT NULL
+);
+"""
+
+
+def trader_id(owner):
+    """64-bit id of a wallet, stable across processes (unlike hash())"""
+    if not owner:
+        return 0
+    return int.from_bytes(hashlib.blake2b(owner.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def segment_size(count):
+    """Bytes used by a segment of count trades, padded to 8 bytes"""
+    size = sum(np.dtype(dtype).itemsize * count for _, dtype in COLUMNS)
+    return (size + 7) // 8 * 8
+
+
+class TradeColumns:
+    """Zero-copy column views of one token's trades"""
+
+    def __init__(self, columns, price_source='trades'):
+        for name, _ in COLUMNS:
+            setattr(self, name, columns[name])
+        self.price_source = price_source
+
+    def __len__(self):
+        return len(self.ts)
+
+    def rows(self, supply):
+        """TradeRows for row-at-a-time consumers (FeatureEngine reads the columns directly)"""
+        for ts, price, side_usd, trader, side in zip(
+            self.ts.tolist(), self.price.tolist(), self.side_usd.tolist(),
+            self.trader.tolist(), self.side.tolist()
+        ):
+            yield TradeRow(
+                ts, price, supply,
+                None if side_usd != side_usd else side_usd,     # NaN -> None
+                SIDE_NAMES.get(side),
+                trader or None
+            )
+
+
+class TradeArchive:
+    """Appends segments under an index lock; reads through a shared mmap"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or config.ARCHIVE_CONFIG['directory']
+        os.makedirs(self.directory, exist_ok=True)
+        self.data_path = os.path.join(self.directory, 'trades.bin')
+        self.index_path = os.path.join(self.directory, 'index.db')
+        self._lock = threading.Lock()
+        self._map = None
+        self._map_size = 0
+
+        open(self.data_path, 'ab').close()
+        create(self.index_path, SCHEMA, timeout=60, autocommit=True)
+
+    def _connect(self):
+        # Autocommit: writers take the index lock with BEGIN IMMEDIATE
+        return connect(self.index_path, timeout=60, autocommit=True)
+
+    # ----- Writing -----
+
+    def append(self, token_address, start_datetime, end_datetime, trades, price_source='trades'):
+        """
+        Write a token's Bitquery trade rows as a new segment
+        complete: the tracking window is over, so the trades are final
+        price_source: 'candles' when the rows are OHLC-derived
+        """
+        columns = {name: [] for name, _ in COLUMNS}
+        for trade in trades:
+            t = trade['Trade']
+            side = t.get('Side') or {}
+            columns['ts'].append(parse_time(trade['Block']['Time']).timestamp())
+            columns['price'].append(float(t.get('PriceInUSD') or 0))
+            columns['side_usd'].append(float(side['AmountInUSD']) if side.get('AmountInUSD') else np.nan)
+            columns['trader'].append(trader_id((t.get('Account') or {}).get('Owner')))
+            columns['side'].append(SIDES.get(side.get('Type'), 0))
+
+        count = len(trades)
+        payload = b''.join(np.asarray(columns[name], dtype=dtype).tobytes() for name, dtype in COLUMNS)
+        payload += b'\0' * (segment_size(count) - len(payload))
+
+        start_ts = parse_time(start_datetime).timestamp()
+        end_ts = parse_time(end_datetime).timestamp()
+        with self._lock, self._connect() as conn:
+            # The index write lock also serializes appends across processes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT count, start_ts, end_ts, complete FROM segments WHERE token_address = ?",
+                    (token_address,)
+                ).fetchone()
+                if (row is not None and not row['complete'] and row['count'] == count and
+                        row['start_ts'] == start_ts and row['end_ts'] == end_ts):
+                    # Same open window, no new trades: keep the segment, only refresh its state
+                    conn.execute(
+                        "UPDATE segments SET complete = ?, written_at = ? WHERE token_address = ?",
+                        (int(end_ts < time.time()), time.time(), token_address)
+                    )
+                    conn.execute("COMMIT")
+                    return
+
+                with open(self.data_path, 'ab') as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(payload)
+                conn.execute(
+                    "INSERT INTO segments (token_address, offset, count, start_ts, end_ts, complete, meta, written_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(token_address) DO UPDATE SET offset = excluded.offset, count = excluded.count, "
+                    "start_ts = excluded.start_ts, end_ts = excluded.end_ts, complete = excluded.complete, "
+                    "meta = excluded.meta, written_at = excluded.written_at",
+                    (
+                        token_address, offset, count, start_ts, end_ts,
+                        int(end_ts < time.time()), json.dumps({'price_source': price_source}), time.time()
+                    )
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def annotate(self, token_address, meta):
+        """Merge chart metadata (supply, marker times) into a token's segment meta"""
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT meta FROM segments WHERE token_address = ?", (token_address,)).fetchone()
+            if row is not None:
+                merged = {**(json.loads(row['meta']) if row['meta'] else {}), **meta}
+                conn.execute(
+                    "UPDATE segments SET meta = ? WHERE token_address = ?",
+                    (json.dumps(merged, default=str), token_address)
+                )
+            conn.execute("COMMIT")
+
+    def compact(self):
+        """
+        Rewrite trades.bin with only the indexed segments, in index order
+        Returns the bytes reclaimed. Readers in other processes keep their old
+        map and offsets, so only run this while nothing else uses the archive
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT token_address, offset, count FROM segments ORDER BY offset"
+                ).fetchall()
+                before = os.path.getsize(self.data_path)
+                tmp_path = f"{self.data_path}.compact"
+                moved = []
+                with open(self.data_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                    for row in rows:
+                        src.seek(row['offset'])
+                        moved.append((dst.tell(), row['token_address']))
+                        dst.write(src.read(segment_size(row['count'])))
+                conn.executemany("UPDATE segments SET offset = ? WHERE token_address = ?", moved)
+                os.replace(tmp_path, self.data_path)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._map = None
+            self._map_size = 0
+        return before - os.path.getsize(self.data_path)
+
+    # ----- Reading -----
+
+    def lookup(self, token_address):
+        """Index row of a token (offset, count, window, meta), or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM segments WHERE token_address = ?", (token_address,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['meta'] = json.loads(entry['meta']) if entry['meta'] else {}
+        return entry
+
+    def has(self, token_address, start_datetime, end_datetime):
+        """True when final trades for exactly this tracking window are archived"""
+        entry = self.lookup(token_address)
+        return entry is not None and self._matches(entry, start_datetime, end_datetime)
+
+    def _matches(self, entry, start_datetime, end_datetime):
+        return (
+            entry['complete'] and
+            entry['start_ts'] == parse_time(start_datetime).timestamp() and
+            entry['end_ts'] == parse_time(end_datetime).timestamp()
+        )
+
+    def columns(self, token_address, start_datetime=None, end_datetime=None, entry=None):
+        """
+        Zero-copy TradeColumns of a token, or None
+        With a window, only final trades of exactly that window are returned
+        """
+        entry = entry or self.lookup(token_address)
+        if entry is None:
+            return None
+        if start_datetime is not None and not self._matches(entry, start_datetime, end_datetime):
+            return None
+        return self._views(entry['offset'], entry['count'], entry['meta'].get('price_source', 'trades'))
+
+    def scan(self, token_addresses=None):
+        """Yield (token_address, TradeColumns) for many tokens, in file order"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT token_address, offset, count FROM segments ORDER BY offset").fetchall()
+        wanted = set(token_addresses) if token_addresses is not None else None
+        for row in rows:
+            if wanted is None or row['token_address'] in wanted:
+                yield row['token_address'], self._views(row['offset'], row['count'])
+
+    def _views(self, offset, count, price_source='trades'):
+        end = offset + segment_size(count)
+        with self._lock:
+            if self._map is None or end > self._map_size:
+                self._remap()
+            buffer = self._map
+
+        columns = {}
+        position = offset
+        for name, dtype in COLUMNS:
+            columns[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=position)
+            position += np.dtype(dtype).itemsize * count
+        return TradeColumns(columns, price_source)
+
+    def _remap(self):
+        """Map the whole file again after other writers appended to it"""
+        # The old map stays alive for as long as earlier views reference it
+        with open(self.data_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._map_size = size
@@ -4,24 +4,145 @@ Bitquery Client - Fetches accurate historical Pump.fun data
 """
 
 import requests
+import time
 from datetime import datetime, timedelta
 import config
+from metrics import Metrics
+from profiler import phase
+from transport import build_transport, ReplayTransport
+from cache import SharedCache, window_ttl
+from planner import PointBudget, RAW_TRADE_LIMIT
+
+LAUNCH_QUERY_LIMIT = 1000       # Row limit of the launch discovery query
+
+# Fields of every trade row handed to the processor
+TRADE_FIELDS = """
+              Block {
+                Time
+              }
+              Trade {
+                Price
+                PriceInUSD
+                AmountInUSD
+                Currency {
+                  MintAddress
+                  Symbol
+                }
+                Account {
+                  Owner
+                }
+                Side {
+                  Type
+                  Currency {
+                    Symbol
+                  }
+                  AmountInUSD
+                }
+              }
+"""
 
 class BitqueryClient:
     
-    def __init__(self, api_token):
+    def __init__(self, api_token, metrics=None, transport=None, cache=None, budget=None):
         self.api_token = api_token
         self.api_url = config.BITQUERY_API_URL
         self.headers = {
             "X-API-KEY": api_token,
             "Content-Type": "application/json"
         }
+        self.metrics = metrics or Metrics()
+        self.transport = transport or build_transport()
+        # Replays re-run the parsers on recorded responses, never on stored results
+        self.replaying = isinstance(self.transport, ReplayTransport)
+        
+        # Pass a SharedCache to share results and coalesce identical
+        # in-flight queries across clients (e.g. Streamlit sessions)
+        self.cache = cache or SharedCache()
+        
+        # API points charged by this client's requests (see planner.py)
+        # Replayed responses were never billed: they count against the run
+        # limit like the recording did, but never touch the daily ledger
+        self.budget = budget or (PointBudget(daily_points=0) if self.replaying else PointBudget())
+    
+    def _request(self, query_type, method, url, **kwargs):
+        """
+        Send a request with retries on transient failures
+        Records latency, bytes received and retries per query type
+        Returns the response, or raises the last error
+        """
+        attempts = config.API_MAX_RETRIES + 1
+        
+        for attempt in range(attempts):
+            started = time.perf_counter()
+            try:
+                with phase("network"):
+                    response = self.transport.request(method, url, **kwargs)
+            except requests.RequestException:
+                self.metrics.observe_request(query_type, time.perf_counter() - started, 0, ok=False)
+                if attempt == attempts - 1:
+                    raise
+            else:
+                ok = response.status_code == 200
+                self.metrics.observe_request(
+                    query_type, time.perf_counter() - started, len(response.content), ok=ok
+                )
+                if ok:
+                    self.budget.charge(query_type, len(response.content))
+                retryable = response.status_code == 429 or response.status_code >= 500
+                if not retryable or attempt == attempts - 1:
+                    return response
+            
+            self.metrics.record_retry(query_type)
+            self.transport.sleep(config.API_RETRY_BACKOFF_SECONDS * (attempt + 1))
+    
+    def _post_graphql(self, query_type, query, timeout=60):
+        """POST a GraphQL query to Bitquery"""
+        return self._request(
+            query_type,
+            "POST",
+            self.api_url,
+            json={"query": query},
+            headers=self.headers,
+            timeout=timeout
+        )
+    
+    def close(self):
+        """Flush and release the transport (finishes a recording)"""
+        self.transport.close()
+    
+    def _decode(self, response):
+        """Decode a JSON response body"""
+        with phase("json_decode"):
+            return response.json()
+    
+    def _graphql_errors(self, query_type, data, label):
+        """Log GraphQL errors of an HTTP 200 response and count them as a failed request"""
+        errors = data.get('errors')
+        if errors:
+            print(f"❌ Bitquery {label} error: {errors[0].get('message')}")
+            self.metrics.record_error(query_type)
+            self.metrics.record_failure(query_type)
+        return bool(errors)
+    
+    def _query_failed(self, query_type, error):
+        """Count an exception as a failed request (transport errors are counted as errors by _request)"""
+        if not isinstance(error, requests.RequestException):
+            self.metrics.record_error(query_type)
+        self.metrics.record_failure(query_type)
     
     def get_tokens_launched_in_timerange(self, start_datetime, end_datetime):
         """
         Get all Pump.fun tokens launched in a specific time range
         Returns list of tokens with launch time, CA, supply
         """
+        return self.discover_launches(start_datetime, end_datetime)[0]
+    
+    def discover_launches(self, start_datetime, end_datetime):
+        """
+        Launches in a time range plus whether the list is complete
+        Returns (tokens, complete); complete is False when the query failed
+        or hit LAUNCH_QUERY_LIMIT, so the range must not be treated as covered
+        """
         start_iso = start_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
         end_iso = end_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
         
@@ -40,7 +161,7 @@ class BitqueryClient:
                   Time: {since: "%s", till: "%s"}
                 }
               }
-              limit: {count: 1000}
+              limit: {count: %d}
               orderBy: {ascending: Block_Time}
             ) {
               Block {
@@ -63,37 +184,41 @@ class BitqueryClient:
                       ... on Solana_ABI_BigInt_Value_Arg {
                         bigInteger
                       }
+                      ... on Solana_ABI_Address_Value_Arg {
+                        address
+                      }
                     }
                   }
                 }
               }
               Transaction {
                 Signature
+                Signer
               }
             }
           }
         }
-        """ % (start_iso, end_iso)
+        """ % (start_iso, end_iso, LAUNCH_QUERY_LIMIT)
         
         try:
-            response = requests.post(
-                self.api_url,
-                json={"query": query},
-                headers=self.headers,
-                timeout=60
-            )
+            response = self._post_graphql("token_launches", query)
             
             if response.status_code == 200:
-                data = response.json()
-                return self._parse_token_launches(data)
+                data = self._decode(response)
+                instructions = (data.get('data') or {}).get('Solana', {}).get('Instructions') or []
+                complete = not self._graphql_errors("token_launches", data, "launches") and \
+                    len(instructions) < LAUNCH_QUERY_LIMIT
+                return self._parse_token_launches(data), complete
             else:
                 print(f"❌ Bitquery API error: {response.status_code}")
                 print(f"Response: {response.text}")
-                return []
+                self.metrics.record_failure("token_launches")
+                return [], False
                 
         except Exception as e:
             print(f"❌ Error fetching tokens: {e}")
-            return []
+            self._query_failed("token_launches", e)
+            return [], False
     
     def get_token_price_history(self, token_address, start_datetime, end_datetime):
         """
@@ -103,6 +228,16 @@ class BitqueryClient:
         start_iso = start_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
         end_iso = end_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
         
+        return self.cache.get_or_compute(
+            ('price_history', token_address, start_iso, end_iso),
+            lambda: self._fetch_price_history(token_address, start_iso, end_iso),
+            self.metrics,
+            "price_history",
+            ttl=window_ttl(end_datetime)
+        )
+    
+    def _fetch_price_history(self, token_address, start_iso, end_iso):
+        """Query Bitquery for one token's trades"""
         query = """
         {
           Solana(dataset: realtime) {
@@ -117,70 +252,566 @@ class BitqueryClient:
                 }
               }
               orderBy: {ascending: Block_Time}
-              limit: {count: 1000}
+              limit: {count: %d}
+            ) {%s}
+          }
+        }
+        """ % (token_address, start_iso, end_iso, RAW_TRADE_LIMIT, TRADE_FIELDS)
+        
+        try:
+            response = self._post_graphql("price_history", query)
+            
+            if response.status_code == 200:
+                data = self._decode(response)
+                if self._graphql_errors("price_history", data, "price history"):
+                    return []
+                trades = data.get('data', {}).get('Solana', {}).get('DEXTradeByTokens', [])
+                return trades
+            else:
+                self.metrics.record_failure("price_history")
+                return []
+                
+        except Exception as e:
+            print(f"❌ Error fetching price history for {token_address[:8]}: {e}")
+            self._query_failed("price_history", e)
+            return []
+    
+    def cached_price_history(self, token_address, start_datetime, end_datetime):
+        """Trades (or candles) already in the cache for this window, else None"""
+        start_iso = start_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
+        end_iso = end_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
+        
+        for kind in ('price_history', 'price_candles'):
+            trades = self.cache.results.get((kind, token_address, start_iso, end_iso))
+            if trades is not None:
+                return trades
+        return None
+    
+    def _trade_conditions(self, windows):
+        """One `any:` condition per mint, each with its own time window"""
+        return ", ".join(
+            '{Trade: {Currency: {MintAddress: {is: "%s"}}, PriceInUSD: {gt: 0}}, '
+            'Block: {Time: {since: "%s", till: "%s"}}}' % (
+                token_address,
+                start_dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+            )
+            for token_address, (start_dt, end_dt) in windows.items()
+        )
+    
+    def get_trade_activity(self, windows):
+        """
+        Batched trade count and USD volume for many mints (query planner probe)
+        windows: {token_address: (start_datetime, end_datetime)}
+        Returns {token_address: {'trades': n, 'volume': usd}},
+        or None if the query failed
+        """
+        query = """
+        {
+          Solana(dataset: realtime) {
+            DEXTradeByTokens(
+              where: {any: [%s]}
+              limit: {count: %d}
+            ) {
+              Trade {
+                Currency {
+                  MintAddress
+                }
+              }
+              trades: count
+              volume: sum(of: Trade_Side_AmountInUSD)
+            }
+          }
+        }
+        """ % (self._trade_conditions(windows), len(windows))
+        
+        try:
+            response = self._post_graphql("trade_activity", query)
+            
+            if response.status_code != 200:
+                self.metrics.record_failure("trade_activity")
+                print(f"❌ Bitquery trade activity error: {response.status_code}")
+                return None
+            
+            data = self._decode(response)
+            if self._graphql_errors("trade_activity", data, "trade activity"):
+                return None
+            
+            rows = data.get('data', {}).get('Solana', {}).get('DEXTradeByTokens', [])
+            activity = {token_address: {'trades': 0, 'volume': 0.0} for token_address in windows}
+            for row in rows:
+                token_address = row.get('Trade', {}).get('Currency', {}).get('MintAddress')
+                if token_address in activity:
+                    activity[token_address]['trades'] += int(row.get('trades') or 0)
+                    activity[token_address]['volume'] += float(row.get('volume') or 0)
+            return activity
+            
+        except Exception as e:
+            print(f"❌ Error fetching trade activity: {e}")
+            self._query_failed("trade_activity", e)
+            return None
+    
+    def prefetch_price_history(self, windows):
+        """
+        Fetch trades of many quiet mints in one query and cache them
+        under the same keys as get_token_price_history
+        Mints with more than BUDGET_CONFIG['batch_max_trades'] trades are
+        left uncached (they would be truncated) and fetched on their own
+        """
+        max_trades = config.BUDGET_CONFIG['batch_max_trades']
+        
+        query = """
+        {
+          Solana(dataset: realtime) {
+            DEXTradeByTokens(
+              where: {any: [%s]}
+              orderBy: {ascending: Block_Time}
+              limitBy: {by: Trade_Currency_MintAddress, count: %d}
+              limit: {count: %d}
+            ) {%s}
+          }
+        }
+        """ % (self._trade_conditions(windows), max_trades + 1, (max_trades + 1) * len(windows), TRADE_FIELDS)
+        
+        try:
+            response = self._post_graphql("price_batch", query)
+            
+            if response.status_code != 200:
+                self.metrics.record_failure("price_batch")
+                print(f"❌ Bitquery batched trades error: {response.status_code}")
+                return 0
+            
+            data = self._decode(response)
+            if self._graphql_errors("price_batch", data, "batched trades"):
+                return 0
+            
+            rows = data.get('data', {}).get('Solana', {}).get('DEXTradeByTokens', [])
+            trades_by_mint = {token_address: [] for token_address in windows}
+            for row in rows:
+                token_address = row.get('Trade', {}).get('Currency', {}).get('MintAddress')
+                if token_address in trades_by_mint:
+                    trades_by_mint[token_address].append(row)
+            
+            cached = 0
+            for token_address, trades in trades_by_mint.items():
+                if trades and len(trades) <= max_trades:
+                    start_dt, end_dt = windows[token_address]
+                    self.cache.results.set((
+                        'price_history',
+                        token_address,
+                        start_dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+                    ), trades, window_ttl(end_dt))
+                    cached += 1
+            return cached
+            
+        except Exception as e:
+            print(f"❌ Error fetching batched trades: {e}")
+            self._query_failed("price_batch", e)
+            return 0
+    
+    def get_token_price_candles(self, token_address, start_datetime, end_datetime):
+        """
+        Price history of a busy token as OHLC candles
+        Returned in the trade row format (open, low, high, close rows per
+        candle, volume on the close row) so enrichment works unchanged
+        """
+        start_iso = start_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
+        end_iso = end_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
+        
+        return self.cache.get_or_compute(
+            ('price_candles', token_address, start_iso, end_iso),
+            lambda: self._fetch_price_candles(token_address, start_datetime, end_datetime),
+            self.metrics,
+            "price_candles",
+            ttl=window_ttl(end_datetime)
+        )
+    
+    def _fetch_price_candles(self, token_address, start_datetime, end_datetime):
+        """Query Bitquery for one token's candles"""
+        interval = config.BUDGET_CONFIG['candle_interval_seconds']
+        candles = int((end_datetime - start_datetime).total_seconds() // interval) + 1
+        
+        query = """
+        {
+          Solana(dataset: realtime) {
+            DEXTradeByTokens(
+              where: {%s}
+              orderBy: {ascendingByField: "Block_Time"}
+              limit: {count: %d}
             ) {
               Block {
-                Time
+                Time(interval: {in: seconds, count: %d})
               }
               Trade {
-                Price
-                PriceInUSD
-                AmountInUSD
+                open: PriceInUSD(minimum: Block_Slot)
+                low: PriceInUSD(minimum: Trade_PriceInUSD)
+                high: PriceInUSD(maximum: Trade_PriceInUSD)
+                close: PriceInUSD(maximum: Block_Slot)
+              }
+              volume: sum(of: Trade_Side_AmountInUSD)
+            }
+          }
+        }
+        """ % (
+            self._trade_conditions({token_address: (start_datetime, end_datetime)})[1:-1],
+            candles,
+            interval
+        )
+        
+        try:
+            response = self._post_graphql("price_candles", query)
+            
+            if response.status_code != 200:
+                self.metrics.record_failure("price_candles")
+                return []
+            
+            data = self._decode(response)
+            if self._graphql_errors("price_candles", data, "candles"):
+                return []
+            rows = data.get('data', {}).get('Solana', {}).get('DEXTradeByTokens', [])
+            return self._candles_to_trades(rows)
+            
+        except Exception as e:
+            print(f"❌ Error fetching candles for {token_address[:8]}: {e}")
+            self._query_failed("price_candles", e)
+            return []
+    
+    def _candles_to_trades(self, rows):
+        """Expand OHLC candles into trade-shaped rows"""
+        trades = []
+        for row in rows:
+            block = {'Time': row['Block']['Time']}
+            prices = row.get('Trade', {})
+            for field in ('open', 'low', 'high', 'close'):
+                if not prices.get(field):
+                    continue
+                trades.append({
+                    'Candle': True,         # Synthetic row: no trader, side or real trade size
+                    'Block': block,
+                    'Trade': {
+                        'PriceInUSD': float(prices[field]),
+                        'Side': {'AmountInUSD': row.get('volume') if field == 'close' else None},
+                    }
+                })
+        return trades
+    
+    def _pool_conditions(self, windows):
+        """One `any:` pool condition per mint, each with its own time window"""
+        return ", ".join(
+            '{Pool: {Market: {BaseCurrency: {MintAddress: {is: "%s"}}}}, '
+            'Block: {Time: {since: "%s", till: "%s"}}}' % (
+                token_address,
+                start_dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+            )
+            for token_address, (start_dt, end_dt) in windows.items()
+        )
+    
+    def get_pool_liquidity(self, windows):
+        """
+        Batched pool reserve history for many mints in one query
+        windows: {token_address: (start_datetime, end_datetime)}
+        Returns {token_address: [(time, quote_reserve_usd), ...]} ascending,
+        or None if the query failed
+        Only the latest series_points updates are returned (final value and
+        chart); get_pool_liquidity_stats averages over the whole window
+        """
+        # Latest N reserve updates per mint inside its own window
+        query = """
+        {
+          Solana(dataset: realtime) {
+            DEXPools(
+              where: {any: [%s]}
+              orderBy: {descending: Block_Time}
+              limitBy: {by: Pool_Market_BaseCurrency_MintAddress, count: %d}
+              limit: {count: %d}
+            ) {
+              Block {
+                Time
+              }
+              Pool {
+                Market {
+                  BaseCurrency {
+                    MintAddress
+                  }
+                }
+                Quote {
+                  PostAmount
+                  PostAmountInUSD
+                }
+              }
+            }
+          }
+        }
+        """ % (
+            self._pool_conditions(windows),
+            config.LIQUIDITY_CONFIG['series_points'],
+            config.LIQUIDITY_CONFIG['series_points'] * len(windows)
+        )
+        
+        try:
+            response = self._post_graphql("pool_liquidity", query)
+            
+            if response.status_code != 200:
+                self.metrics.record_failure("pool_liquidity")
+                print(f"❌ Bitquery liquidity error: {response.status_code}")
+                return None
+            
+            data = self._decode(response)
+            if self._graphql_errors("pool_liquidity", data, "liquidity"):
+                return None
+            
+            rows = data.get('data', {}).get('Solana', {}).get('DEXPools', [])
+            series = {token_address: [] for token_address in windows}
+            for row in reversed(rows):
+                pool = row.get('Pool', {})
+                token_address = pool.get('Market', {}).get('BaseCurrency', {}).get('MintAddress')
+                if token_address in series:
+                    series[token_address].append((
+                        row['Block']['Time'],
+                        float(pool.get('Quote', {}).get('PostAmountInUSD') or 0)
+                    ))
+            return series
+            
+        except Exception as e:
+            print(f"❌ Error fetching pool liquidity: {e}")
+            self._query_failed("pool_liquidity", e)
+            return None
+    
+    def get_pool_liquidity_stats(self, windows):
+        """
+        Average quote reserve and update count over each mint's whole window
+        windows: {token_address: (start_datetime, end_datetime)}
+        Returns {token_address: {'avg_liquidity': usd, 'updates': n}},
+        or None if the query failed
+        """
+        # One aggregated row per mint
+        query = """
+        {
+          Solana(dataset: realtime) {
+            DEXPools(
+              where: {any: [%s]}
+              limit: {count: %d}
+            ) {
+              Pool {
+                Market {
+                  BaseCurrency {
+                    MintAddress
+                  }
+                }
+              }
+              avg_liquidity: average(of: Pool_Quote_PostAmountInUSD)
+              updates: count
+            }
+          }
+        }
+        """ % (self._pool_conditions(windows), len(windows))
+        
+        try:
+            response = self._post_graphql("pool_liquidity_avg", query)
+            
+            if response.status_code != 200:
+                self.metrics.record_failure("pool_liquidity_avg")
+                print(f"❌ Bitquery liquidity average error: {response.status_code}")
+                return None
+            
+            data = self._decode(response)
+            if self._graphql_errors("pool_liquidity_avg", data, "liquidity average"):
+                return None
+            
+            rows = data.get('data', {}).get('Solana', {}).get('DEXPools', [])
+            stats = {}
+            for row in rows:
+                token_address = row.get('Pool', {}).get('Market', {}).get('BaseCurrency', {}).get('MintAddress')
+                if token_address in windows:
+                    stats[token_address] = {
+                        'avg_liquidity': float(row.get('avg_liquidity') or 0),
+                        'updates': int(row.get('updates') or 0),
+                    }
+            return stats
+            
+        except Exception as e:
+            print(f"❌ Error fetching pool liquidity averages: {e}")
+            self._query_failed("pool_liquidity_avg", e)
+            return None
+    
+    def get_holder_balances(self, snapshots):
+        """
+        Batched holder balances for many mints, each at its own snapshot time
+        snapshots: {token_address: snapshot_datetime}
+        Uses the latest PostBalance per (mint, owner) up to the snapshot
+        Returns {token_address: [(owner, balance), ...]} largest first,
+        or None if the query failed
+        """
+        conditions = []
+        for token_address, snapshot_dt in snapshots.items():
+            conditions.append(
+                '{BalanceUpdate: {Currency: {MintAddress: {is: "%s"}}}, '
+                'Block: {Time: {till: "%s"}}}' % (
+                    token_address,
+                    snapshot_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+                )
+            )
+        
+        max_holders = config.HOLDERS_CONFIG['max_holders']
+        query = """
+        {
+          Solana(dataset: realtime) {
+            BalanceUpdates(
+              where: {any: [%s]}
+              orderBy: {descendingByField: "BalanceUpdate_Holding_maximum"}
+              limitBy: {by: BalanceUpdate_Currency_MintAddress, count: %d}
+              limit: {count: %d}
+            ) {
+              BalanceUpdate {
                 Currency {
                   MintAddress
-                  Symbol
                 }
-                Side {
-                  Currency {
-                    Symbol
+                Account {
+                  Token {
+                    Owner
                   }
-                  AmountInUSD
                 }
+                Holding: PostBalance(maximum: Block_Slot)
               }
             }
           }
         }
-        """ % (token_address, start_iso, end_iso)
+        """ % (", ".join(conditions), max_holders, max_holders * len(snapshots))
         
         try:
-            response = requests.post(
-                self.api_url,
-                json={"query": query},
-                headers=self.headers,
-                timeout=60
+            response = self._post_graphql("holder_balances", query)
+            
+            if response.status_code != 200:
+                self.metrics.record_failure("holder_balances")
+                print(f"❌ Bitquery holders error: {response.status_code}")
+                return None
+            
+            data = self._decode(response)
+            if self._graphql_errors("holder_balances", data, "holders"):
+                return None
+            
+            rows = data.get('data', {}).get('Solana', {}).get('BalanceUpdates', [])
+            balances = {token_address: [] for token_address in snapshots}
+            for row in rows:
+                update = row.get('BalanceUpdate', {})
+                token_address = update.get('Currency', {}).get('MintAddress')
+                owner = update.get('Account', {}).get('Token', {}).get('Owner')
+                balance = float(update.get('Holding') or 0)
+                if token_address in balances and owner and balance > 0:
+                    balances[token_address].append((owner, balance))
+            
+            for holders in balances.values():
+                holders.sort(key=lambda h: h[1], reverse=True)
+            return balances
+            
+        except Exception as e:
+            print(f"❌ Error fetching holder balances: {e}")
+            self._query_failed("holder_balances", e)
+            return None
+    
+    def get_creator_trades(self, windows):
+        """
+        Batched creator buy/sell totals for many mints in one query
+        windows: {token_address: (creator, start_datetime, end_datetime)}
+        Returns {token_address: {'bought': amount, 'sold': amount}},
+        or None if the query failed
+        """
+        conditions = []
+        for token_address, (creator, start_dt, end_dt) in windows.items():
+            conditions.append(
+                '{Trade: {Currency: {MintAddress: {is: "%s"}}, Account: {Owner: {is: "%s"}}}, '
+                'Block: {Time: {since: "%s", till: "%s"}}}' % (
+                    token_address,
+                    creator,
+                    start_dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+                )
             )
+        
+        # One aggregated row per (mint, creator)
+        query = """
+        {
+          Solana(dataset: realtime) {
+            DEXTradeByTokens(
+              where: {any: [%s]}
+              limit: {count: %d}
+            ) {
+              Trade {
+                Currency {
+                  MintAddress
+                }
+                Account {
+                  Owner
+                }
+              }
+              bought: sum(of: Trade_Amount, if: {Trade: {Side: {Type: {is: buy}}}})
+              sold: sum(of: Trade_Amount, if: {Trade: {Side: {Type: {is: sell}}}})
+            }
+          }
+        }
+        """ % (", ".join(conditions), len(windows))
+        
+        try:
+            response = self._post_graphql("creator_trades", query)
+            
+            if response.status_code != 200:
+                self.metrics.record_failure("creator_trades")
+                print(f"❌ Bitquery creator trades error: {response.status_code}")
+                return None
+            
+            data = self._decode(response)
+            if self._graphql_errors("creator_trades", data, "creator trades"):
+                return None
+            
+            rows = data.get('data', {}).get('Solana', {}).get('DEXTradeByTokens', [])
+            totals = {token_address: {'bought': 0.0, 'sold': 0.0} for token_address in windows}
+            for row in rows:
+                token_address = row.get('Trade', {}).get('Currency', {}).get('MintAddress')
+                if token_address in totals:
+                    totals[token_address]['bought'] += float(row.get('bought') or 0)
+                    totals[token_address]['sold'] += float(row.get('sold') or 0)
+            return totals
             
-            if response.status_code == 200:
-                data = response.json()
-                trades = data.get('data', {}).get('Solana', {}).get('DEXTradeByTokens', [])
-                return trades
-            else:
-                return []
-                
         except Exception as e:
-            print(f"❌ Error fetching price history for {token_address[:8]}: {e}")
-            return []
+            print(f"❌ Error fetching creator trades: {e}")
+            self._query_failed("creator_trades", e)
+            return None
     
     def get_token_supply(self, token_address):
         """
         Get total supply for a token from Solscan
         """
+        supply = self.cache.get_or_compute(
+            ('supply', token_address),
+            lambda: self._fetch_supply(token_address),
+            self.metrics,
+            "supply",
+            cache_if=lambda value: value is not None
+        )
+        return supply if supply is not None else config.PUMPFUN_DEFAULT_SUPPLY
+    
+    def _fetch_supply(self, token_address):
+        """Query Solscan for supply, None if the lookup failed"""
         try:
-            response = requests.get(
+            response = self._request(
+                "token_supply",
+                "GET",
                 f"{config.SOLSCAN_API_URL}/token/meta",
                 params={"token": token_address},
                 timeout=10
             )
             
             if response.status_code == 200:
-                data = response.json()
+                data = self._decode(response)
                 supply_str = data.get('supply', '0')
                 supply = int(float(supply_str))
                 return supply if supply > 0 else config.PUMPFUN_DEFAULT_SUPPLY
         except:
             pass
         
-        return config.PUMPFUN_DEFAULT_SUPPLY
+        return None
     
     def calculate_mc_from_price_and_supply(self, price_usd, supply):
         """Calculate market cap: Price * Supply"""
@@ -210,10 +841,22 @@ class BitqueryClient:
                 tokens.append({
                     'token_address': token_address,
                     'launch_time': launch_time,
-                    'signature': instr.get('Transaction', {}).get('Signature')
+                    'signature': instr.get('Transaction', {}).get('Signature'),
+                    'creator': self._parse_creator(instr)
                 })
                 
             except Exception as e:
                 continue
         
         return tokens
+    
+    def _parse_creator(self, instr):
+        """Creator from the create instruction's 'creator' argument, else the signer"""
+        arguments = instr.get('Instruction', {}).get('Program', {}).get('Arguments') or []
+        for arg in arguments:
+            if arg.get('Name') == 'creator':
+                address = (arg.get('Value') or {}).get('address')
+                if address:
+                    return address
+        
+        return instr.get('Transaction', {}).get('Signer')
@@ -0,0 +1,189 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Cache - Process-wide result cache with single-flight request coalescing
+One instance can be shared by every BitqueryClient in the process
+(e.g. across Streamlit sessions) so identical queries are paid for once
+Results of windows that have not ended yet expire after
+CACHE_CONFIG['open_window_seconds'], so later runs see the new trades
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+import config
+
+
+def window_ttl(end_datetime):
+    """Seconds to keep a result of a window ending at end_datetime, None once it has ended"""
+    if end_datetime.tzinfo is None:
+        end_datetime = end_datetime.replace(tzinfo=timezone.utc)
+    if end_datetime <= datetime.now(timezone.utc):
+        return None
+    return config.CACHE_CONFIG['open_window_seconds']
+
+
+def approx_size(value, sample=16):
+    """
+    Rough memory footprint of a cached value in bytes
+    Long lists (trade lists) are estimated from their first sample items
+    """
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            approx_size(k, sample) + approx_size(v, sample) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        head = value[:sample]
+        items = sum(approx_size(item, sample) for item in head)
+        return sys.getsizeof(value) + (items * len(value) // len(head) if head else 0)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used mapping bounded by entries and approximate bytes
+    Entries set with a ttl (seconds) are gone once it runs out
+    """
+
+    def __init__(self, maxsize, max_bytes=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            if key in self._expires and self._expires[key] <= time.time():
+                self._remove(key)
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value, ttl=None):
+        size = approx_size(value) if self.max_bytes else 0
+        with self._lock:
+            self.bytes += size - self._sizes.get(key, 0)
+            self._data[key] = value
+            self._sizes[key] = size
+            if ttl is None:
+                self._expires.pop(key, None)
+            else:
+                self._expires[key] = time.time() + ttl
+            self._data.move_to_end(key)
+            # The newest entry is always kept, even if it alone exceeds max_bytes
+            while len(self._data) > self.maxsize or (
+                self.max_bytes and self.bytes > self.max_bytes and len(self._data) > 1
+            ):
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        del self._data[key]
+        self.bytes -= self._sizes.pop(key)
+        self._expires.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its result"""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns (value, leader) where leader is True for the caller that ran fn"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, False
+
+        try:
+            flight.value = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.value, True
+
+
+class SharedCache:
+    """LRU results plus single-flight coalescing of in-flight computations"""
+
+    def __init__(self, maxsize=None, max_bytes=None):
+        self.results = LRUCache(
+            maxsize or config.CACHE_CONFIG['max_entries'],
+            max_bytes or config.CACHE_CONFIG['max_mb'] * 1024 * 1024
+        )
+        self.flights = SingleFlight()
+
+    def get_or_compute(self, key, fn, metrics=None, name=None, cache_if=bool, ttl=None):
+        """
+        Return the cached value for key, or compute it once
+        Concurrent callers with the same key wait for the first one
+        Only values passing cache_if are stored (failed lookups are retried)
+        ttl: seconds to keep the value (see window_ttl), None = until evicted
+        """
+        value = self.results.get(key)
+        if value is not None:
+            if metrics:
+                metrics.record_cache(name, True)
+            return value
+
+        def compute():
+            result = fn()
+            if cache_if(result):
+                self.results.set(key, result, ttl)
+            return result
+
+        value, leader = self.flights.do(key, compute)
+        if metrics:
+            # A coalesced wait costs no upstream request, so it counts as a hit
+            metrics.record_cache(name, not leader)
+        return value
+
+
+def config_hash():
+    """Short fingerprint of every config value that affects run results"""
+    relevant = {
+        'analysis_window': config.ANALYSIS_WINDOW,
+        'successful': config.SUCCESSFUL_TOKEN_CONFIG,
+        'failed': config.FAILED_TOKEN_CONFIG,
+        'limits': [config.MAX_SUCCESSFUL_TOKENS, config.MAX_FAILED_TOKENS, config.MAX_TOKENS_TO_PROCESS],
+        'supply': config.PUMPFUN_DEFAULT_SUPPLY,
+        'features': config.FEATURES_CONFIG,
+        'liquidity': config.LIQUIDITY_CONFIG,
+        'holders': config.HOLDERS_CONFIG,
+        'dev_activity': config.DEV_ACTIVITY_CONFIG,
+        'transport': config.TRANSPORT_CONFIG['mode'],
+    }
+    encoded = json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:12]
@@ -0,0 +1,74 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Token Charts - Market cap over time for the token drill-down
+Reads a token's price column straight from the trade archive (a zero-copy
+view) and downsamples it with LTTB, so a chart costs a few hundred points
+no matter how many trades the token had. Supply and the entry_end / peak /
+holder_snapshot marker times come from the archive's segment metadata.
+"""
+
+import numpy as np
+
+MARKERS = ['entry_end_time', 'peak_time', 'holder_snapshot_time']
+
+
+def mc_series(archive, entry, points):
+    """
+    Downsampled (unix seconds, market cap) arrays of an archived token
+    entry: archive.lookup() row; None when it has no priced trades or supply
+    """
+    supply = entry['meta'].get('supply')
+    columns = archive.columns(entry['token_address'], entry=entry)
+    if not supply or columns is None:
+        return None
+
+    priced = columns.price > 0
+    times = columns.ts[priced]
+    prices = columns.price[priced]
+    if not len(times):
+        return None
+
+    # LTTB picks the same points for price and MC (a constant scale), so
+    # only the few hundred survivors get multiplied
+    times, prices = lttb(times, prices, points)
+    return times, prices * float(supply)
+
+
+def markers(entry):
+    """{marker: time string} of an archived token"""
+    return {name: entry['meta'].get(name) for name in MARKERS}
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+    Keeps the points that shape the curve (peaks, dumps) so the chart looks
+    the same with threshold points; each bucket is one vectorized step
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    every = (n - 2) / (threshold - 2)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle corner
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(areas.argmax())
+        picked[i + 1] = a
+
+    return x[picked], y[picked]
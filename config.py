@@ -11,6 +11,19 @@ Edit these values anytime on GitHub without recoding
 
 BITQUERY_API_URL = "https://graphql.bitquery.io"
 
+# Retry transient API failures (timeouts, 429, 5xx)
+API_MAX_RETRIES = 2
+API_RETRY_BACKOFF_SECONDS = 2
+
+# Transport under BitqueryClient:
+# 'live' = network, 'record' = network + archive every exchange,
+# 'replay' = serve a recorded archive offline (no API key needed)
+TRANSPORT_CONFIG = {
+    'mode': 'live',
+    'archive_dir': 'recordings/latest',
+    'replay_speed': 0,          # 0 = as fast as possible, 1 = real time, N = N x faster
+}
+
 # ============================================
 # ANALYSIS WINDOW CONFIGURATION
 # ============================================
@@ -42,6 +55,20 @@ SUCCESSFUL_TOKEN_CONFIG = {
     'holder_snapshot_before_peak_minutes': 10,  # Snapshot 10 mins before peak
 }
 
+# Creator buy/sell totals for the dev_dump rule
+DEV_ACTIVITY_CONFIG = {
+    'batch_size': 25,           # Mints per batched creator trades query
+}
+
+# Holder snapshot engine (successful tokens only)
+HOLDERS_CONFIG = {
+    'enabled': True,
+    'batch_size': 20,           # Mints per batched balance query
+    'concurrency': 4,           # Batches in flight at once
+    'max_holders': 1000,        # Holders fetched per mint (caps holder_count)
+    'top_holders': 10,          # Top holders kept in the output
+}
+
 # ============================================
 # FAILED TOKEN CRITERIA
 # ============================================
@@ -62,17 +89,25 @@ FAILED_TOKEN_CONFIG = {
         'max_final_liquidity': 5000,        # Liquidity pulled (< $5K)
     },
     
-    # Type 3: Dev Dump (PHASE 2 - Disabled for now)
+    # Type 3: Dev Dump
     'dev_dump': {
-        'enabled': False,
-        'min_initial_mc': 15000,
-        'dev_sold_percentage': 50,
+        'enabled': True,
+        'min_initial_mc': 15000,            # Must show initial promise
+        'dev_sold_percentage': 50,          # Creator sold 50%+ of their tokens
     },
     
     # Entry window for failed tokens
     'entry_window_minutes': 30,             # First 30 mins after launch
 }
 
+# Extra per-token trade features (features.py), all computed in one pass
+# Core features (price, entry_end, trade_liquidity) always run
+FEATURES_CONFIG = {
+    'enabled': ['drawdown', 'buy_sell', 'bursts', 'unique_traders'],
+    'burst_seconds': 60,                    # Sliding window for max_burst_trades
+    'trader_windows_minutes': [5, 30, 60],  # unique_traders_<N>m after launch
+}
+
 # ============================================
 # PROCESSING LIMITS
 # ============================================
@@ -84,9 +119,15 @@ MAX_FAILED_TOKENS = 300
 # Maximum tokens to process in one run (API limit protection)
 MAX_TOKENS_TO_PROCESS = 500
 
-# Batch size for progress updates
+# Tokens per processing batch (batched liquidity queries cover one batch)
 BATCH_SIZE = 50
 
+# Pool reserve liquidity (feeds final_liquidity for the rug pull rule)
+LIQUIDITY_CONFIG = {
+    'batch_size': 25,           # Mints per batched reserve query
+    'series_points': 200,       # Latest reserve updates kept per mint
+}
+
 # ============================================
 # EXTERNAL APIs
 # ============================================
@@ -108,6 +149,150 @@ OUTPUT_DIR = "output"
 DATE_FORMAT = "%Y-%m-%d"
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Columnar export (Parquet via pyarrow) next to the JSON files
+EXPORT_CONFIG = {
+    'parquet': False,
+    'include_trades': False,        # Also write every token's trade series
+    'compression': 'zstd',
+    'row_group_size': 100000,
+}
+
+# Append-only memory-mapped archive of every fetched token's trades
+# (drill-down charts, research scans, re-enrichment without API calls)
+ARCHIVE_CONFIG = {
+    'enabled': True,
+    'directory': f"{OUTPUT_DIR}/archive",
+}
+
+# Per-token market cap charts (app drill-down)
+CHARTS_CONFIG = {
+    'max_points': 400,          # Points per chart after LTTB downsampling
+}
+
+# Indexed local store of every run's enriched tokens (History tab)
+STORE_CONFIG = {
+    'enabled': True,
+    'db_path': f"{OUTPUT_DIR}/tracker.db",
+}
+
+# Hourly / daily counters of every saved run (Trends tab)
+ROLLUP_CONFIG = {
+    'enabled': True,
+    'db_path': f"{OUTPUT_DIR}/rollups.db",
+    'roi_buckets': [2, 10, 50, 80],                              # ROI histogram edges (x)
+    'peak_mc_buckets': [10_000, 50_000, 100_000, 1_000_000, 10_000_000],  # Peak MC histogram edges ($)
+}
+
+# Launch ranges and enriched tokens of earlier runs, reused by
+# overlapping windows (same tracking hours and config hash only)
+REGISTRY_CONFIG = {
+    'enabled': True,
+    'db_path': f"{OUTPUT_DIR}/registry.db",
+}
+
+# ============================================
+# CACHE CONFIGURATION
+# ============================================
+
+CACHE_CONFIG = {
+    # Process-wide API result cache shared across app sessions
+    'max_entries': 5000,
+    'max_mb': 512,              # Approximate memory bound (trade lists dominate)
+    'open_window_seconds': 60,  # Expiry of results for windows that have not ended yet
+}
+
+# Background tracker runs (shared by all app sessions)
+JOBS_CONFIG = {
+    'max_workers': 2,           # Runs executing at the same time
+    'max_jobs': 20,             # Finished runs kept for re-attaching
+    'poll_seconds': 1.5,        # UI refresh interval while a run is active
+    'reuse_seconds': 300,       # Reuse of a finished run whose tracking windows were still open
+}
+
+# ============================================
+# API POINT BUDGET (planner.py)
+# ============================================
+
+BUDGET_CONFIG = {
+    # Probe trade activity first, pick a fetch strategy per token
+    # and drop the least promising tokens once the budget is tight
+    'enabled': True,
+    'run_points': 50000,        # Per run (None = unlimited)
+    'daily_points': 500000,     # Per UTC day across all runs/workers (None = unlimited)
+    'ledger_path': f"{OUTPUT_DIR}/budget.db",
+
+    # Cost model - calibrate against the Bitquery points dashboard
+    'query_points': {           # Base points per request
+        'token_launches': 50,
+        'trade_activity': 20,
+        'price_history': 10,
+        'price_batch': 15,
+        'price_candles': 10,
+        'pool_liquidity': 20,
+        'pool_liquidity_avg': 20,
+        'holder_balances': 30,
+        'creator_trades': 20,
+        'token_supply': 0,      # Solscan, not billed by Bitquery
+    },
+    'default_query_points': 10,
+    'points_per_kb': 0.05,      # Plus points per KB of response
+    'row_kb': {                 # Response size per returned row
+        'price_history': 0.35,
+        'price_batch': 0.35,
+        'price_candles': 0.2,
+    },
+    'extra_points_per_token': 3,        # Share of liquidity/dev/holder queries
+
+    # Strategy selection by probed trade count
+    'probe_batch_size': 100,            # Mints per trade activity query
+    'batch_size': 20,                   # Mints per multi-mint trades query
+    'batch_max_trades': 150,            # Quiet tokens share one trades query
+    'candle_min_trades': 1000,          # Busy tokens use candles (raw caps at 1000 rows)
+    'candle_interval_seconds': 60,
+    'default_expected_trades': 500,     # Estimate when the probe is unavailable
+}
+
+# ============================================
+# METRICS CONFIGURATION
+# ============================================
+
+METRICS_CONFIG = {
+    # Where to export run metrics: 'json' appends to summary file,
+    # 'prometheus' serves text format on prometheus_host:prometheus_port
+    'sinks': ['json'],
+    'prometheus_port': 9108,
+    'prometheus_host': '127.0.0.1',     # '0.0.0.0' to let other machines scrape it
+
+    # Request latency histogram buckets (seconds)
+    'latency_buckets': [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60],
+}
+
+# ============================================
+# DISTRIBUTED BACKFILL (workqueue.py)
+# ============================================
+
+WORK_QUEUE_CONFIG = {
+    # Put the queue (and OUTPUT_DIR) on a disk shared by all worker machines
+    'db_path': f"{OUTPUT_DIR}/work_queue.db",
+    'slice_hours': 2,           # Default task size within a preset window
+    'lease_seconds': 300,       # Lease expires unless renewed by heartbeat
+    'max_attempts': 3,          # Give up on a task after this many leases
+    'poll_seconds': 10,         # Idle wait when no task is available
+}
+
+# ============================================
+# PROFILING CONFIGURATION
+# ============================================
+
+PROFILING_CONFIG = {
+    # Opt-in: sample CPU stacks and time each token (also a sidebar toggle)
+    'enabled': False,
+    'sample_interval_ms': 5,
+
+    # How many of the slowest tokens to list in the summary
+    'slowest_tokens': 10,
+}
+
 # ============================================
 # UI CONFIGURATION
 # ============================================
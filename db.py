@@ -0,0 +1,39 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+SQLite Helpers - Short-lived connections for the local databases
+Token store, window registry, rollups, point ledger and trade archive index
+open one connection per operation, so threads and processes can share a
+file. (The work queue keeps its own rollback-journal connection for
+shared disks.)
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+
+@contextmanager
+def connect(db_path, timeout=30, autocommit=False):
+    """
+    WAL connection returning sqlite3.Row rows, closed on exit
+    Committed on a clean exit; with autocommit the caller issues its own
+    BEGIN IMMEDIATE / COMMIT
+    """
+    conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None if autocommit else '')
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    try:
+        yield conn
+        if not autocommit:
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def create(db_path, schema, **kwargs):
+    """Create the database's directory and apply its CREATE ... IF NOT EXISTS schema"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with connect(db_path, **kwargs) as conn:
+        conn.executescript(schema)
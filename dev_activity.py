@@ -0,0 +1,51 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Dev Activity Engine - How much of their tokens each creator sold
+Fetches creator buy/sell totals for many mints per request (dev_dump rule)
+"""
+
+import config
+from cache import window_ttl
+
+
+class DevActivityEngine:
+
+    def __init__(self, bitquery_client):
+        self.bitquery = bitquery_client
+
+    def _key(self, token_address, end_datetime):
+        return ('dev_activity', token_address, end_datetime.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+    def prefetch(self, windows):
+        """
+        Load creator totals for every mint not cached yet
+        windows: {token_address: (creator, start_datetime, end_datetime)}
+        Costs one request per DEV_ACTIVITY_CONFIG['batch_size'] mints
+        """
+        missing = {}
+        for token_address, window in windows.items():
+            if not window[0]:
+                continue
+            cached = self.bitquery.cache.results.get(self._key(token_address, window[2]))
+            self.bitquery.metrics.record_cache("dev_activity", cached is not None)
+            if cached is None:
+                missing[token_address] = window
+
+        mints = list(missing)
+        batch_size = config.DEV_ACTIVITY_CONFIG['batch_size']
+        for i in range(0, len(mints), batch_size):
+            batch = {mint: missing[mint] for mint in mints[i:i + batch_size]}
+            totals = self.bitquery.get_creator_trades(batch)
+            if totals is None:
+                continue
+
+            for token_address, amounts in totals.items():
+                end_datetime = batch[token_address][2]
+                self.bitquery.cache.results.set(self._key(token_address, end_datetime), amounts, window_ttl(end_datetime))
+
+    def dev_sold_percentage(self, token_address, end_datetime):
+        """Creator's sold amount as % of what they bought, None if unknown"""
+        amounts = self.bitquery.cache.results.get(self._key(token_address, end_datetime))
+        if not amounts or amounts['bought'] <= 0:
+            return None
+        return min(amounts['sold'] / amounts['bought'] * 100, 100.0)
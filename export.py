@@ -0,0 +1,181 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Columnar Export - Parquet files of enriched tokens and trade series
+Hive-partitioned by date so pyarrow/pandas/duckdb can prune and push down:
+    OUTPUT_DIR/parquet/tokens/date=YYYY-MM-DD/part-HHMM-HHMM.parquet
+    OUTPUT_DIR/parquet/trades/date=YYYY-MM-DD/part-HHMM-HHMM.parquet
+Every part of a dataset has the same pinned schema, and a token lives in
+one part only: overlapping windows move it out of older parts of its date.
+"""
+
+import os
+import config
+from store import parse_time
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:         # pyarrow ships with streamlit, but keep the CLI usable without it
+    pa = None
+    pc = None
+    pq = None
+
+# Scalar token fields written to the tokens dataset (name, pyarrow type name)
+# New enriched fields must be added here to be exported
+TOKEN_FIELDS = [
+    ('token_address', 'string'),
+    ('category', 'string'),
+    ('launch_time', 'timestamp'),
+    ('signature', 'string'),
+    ('creator', 'string'),
+    ('price_source', 'string'),
+    ('supply', 'int64'),
+    ('launch_price', 'float64'),
+    ('peak_price', 'float64'),
+    ('final_price', 'float64'),
+    ('peak_time', 'timestamp'),
+    ('time_to_peak_seconds', 'float64'),
+    ('entry_end_time', 'timestamp'),
+    ('entry_end_mc', 'float64'),
+    ('time_to_entry_end_seconds', 'float64'),
+    ('launch_mc', 'float64'),
+    ('peak_mc', 'float64'),
+    ('final_mc', 'float64'),
+    ('tank_percentage', 'float64'),
+    ('roi_from_entry_end', 'float64'),
+    ('avg_liquidity', 'float64'),
+    ('final_liquidity', 'float64'),
+    ('liquidity_source', 'string'),
+    ('trade_avg_liquidity', 'float64'),
+    ('trade_final_liquidity', 'float64'),
+    ('dev_sold_percentage', 'float64'),
+    ('holder_snapshot_time', 'timestamp'),
+    ('max_drawdown_before_peak_pct', 'float64'),
+    ('buy_volume_usd', 'float64'),
+    ('sell_volume_usd', 'float64'),
+    ('buy_sell_ratio', 'float64'),
+    ('max_burst_trades', 'int64'),
+    ('max_burst_seconds_after_launch', 'float64'),
+    ('unique_traders', 'int64'),
+]
+
+
+def parquet_available():
+    return pa is not None
+
+
+def _partition_path(dataset, date_label, part_name):
+    directory = os.path.join(config.OUTPUT_DIR, 'parquet', dataset, f"date={date_label}")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{part_name}.parquet")
+
+
+def _arrow_type(name):
+    if name == 'timestamp':
+        return pa.timestamp('s', tz='UTC')
+    return getattr(pa, name)()
+
+
+def token_schema():
+    """Pinned schema of the tokens dataset (all-null parts keep their column types)"""
+    fields = list(TOKEN_FIELDS)
+    fields += [
+        (f'unique_traders_{minutes}m', 'int64')
+        for minutes in config.FEATURES_CONFIG['trader_windows_minutes']
+    ]
+    return pa.schema([(name, _arrow_type(type_name)) for name, type_name in fields])
+
+
+def _drop_tokens(path, token_addresses):
+    """
+    Remove tokens about to be re-exported from the other parts of their date
+    so overlapping or repeated windows never store a token twice
+    """
+    directory = os.path.dirname(path)
+    wanted = pa.array(sorted(token_addresses), pa.string())
+    for name in sorted(os.listdir(directory)):
+        part = os.path.join(directory, name)
+        if part == path or not name.endswith('.parquet'):
+            continue
+        table = pq.read_table(part)
+        keep = pc.invert(pc.is_in(table['token_address'].cast(pa.string()), value_set=wanted))
+        kept = table.filter(keep)
+        if kept.num_rows == table.num_rows:
+            continue
+        if kept.num_rows:
+            _write(kept, part)
+        else:
+            os.remove(part)
+
+
+def _write(table, path):
+    pq.write_table(
+        table,
+        path,
+        compression=config.EXPORT_CONFIG['compression'],
+        row_group_size=config.EXPORT_CONFIG['row_group_size'],
+    )
+
+
+def _token_row(token):
+    """Scalar fields only; *_time strings become UTC timestamps"""
+    row = {}
+    for key, value in token.items():
+        if key.endswith('_time') and isinstance(value, str):
+            row[key] = parse_time(value)
+        elif value is None or isinstance(value, (str, int, float, bool)):
+            row[key] = value
+    return row
+
+
+def export_tokens(tokens, date_label, part_name):
+    """Write the enriched per-token table (one row per token)"""
+    table = pa.Table.from_pylist([_token_row(t) for t in tokens], schema=token_schema())
+    path = _partition_path('tokens', date_label, part_name)
+    _drop_tokens(path, {t['token_address'] for t in tokens})
+    _write(table, path)
+    return path
+
+
+def _trade_columns(trades):
+    """block_time, price_usd, amount_usd and side_amount_usd arrays of one token"""
+    if hasattr(trades, 'rows'):
+        # archive.TradeColumns: the archive keeps no trade notional, so amount_usd is null
+        return [
+            pa.array(trades.ts.astype('int64'), pa.timestamp('s', tz='UTC')),
+            pa.array(trades.price, pa.float64()),
+            pa.nulls(len(trades), pa.float64()),
+            pa.array(trades.side_usd, pa.float64(), from_pandas=True).fill_null(0.0),
+        ]
+
+    return [
+        pa.array([parse_time(trade['Block']['Time']) for trade in trades], pa.timestamp('s', tz='UTC')),
+        pa.array([float(trade['Trade'].get('PriceInUSD') or 0) for trade in trades], pa.float64()),
+        pa.array([float(trade['Trade'].get('AmountInUSD') or 0) for trade in trades], pa.float64()),
+        pa.array([
+            float((trade['Trade'].get('Side') or {}).get('AmountInUSD') or 0) for trade in trades
+        ], pa.float64()),
+    ]
+
+
+def export_trades(trade_series, date_label, part_name):
+    """
+    Write per-token trade series in long format
+    trade_series: {token_address: [Bitquery trade, ...] or archive.TradeColumns}
+    """
+    names = ['block_time', 'price_usd', 'amount_usd', 'side_amount_usd']
+    tables = []
+    for token_address, trades in trade_series.items():
+        columns = _trade_columns(trades)
+        tables.append(pa.table(
+            [pa.array([token_address] * len(trades), pa.string())] + columns,
+            names=['token_address'] + names
+        ))
+
+    table = pa.concat_tables(tables)
+    table = table.set_column(0, 'token_address', table['token_address'].combine_chunks().dictionary_encode())
+    path = _partition_path('trades', date_label, part_name)
+    _drop_tokens(path, set(trade_series))
+    _write(table, path)
+    return path
@@ -0,0 +1,432 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Feature Engine - Every per-token trade metric in one pass
+Each feature is an online accumulator fed one trade row at a time;
+the engine parses each trade once and hands it to all registered
+features, so adding a feature never adds another loop over the trades.
+"""
+
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import config
+
+# name -> Feature subclass
+FEATURES = {}
+
+# Needed by enrichment and categorization, always computed
+CORE_FEATURES = ['price', 'entry_end', 'trade_liquidity']
+
+
+def format_ts(ts):
+    """Unix seconds -> Bitquery-style time string"""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def price_source(trades):
+    """'candles' for OHLC-derived rows (bitquery_client candles strategy), else 'trades'"""
+    if hasattr(trades, 'rows'):
+        return trades.price_source
+    return 'candles' if trades and trades[0].get('Candle') else 'trades'
+
+
+def register(cls):
+    """Class decorator adding a feature to the registry"""
+    FEATURES[cls.name] = cls
+    return cls
+
+
+class TradeRow:
+    """One trade, parsed once and shared by every feature"""
+    __slots__ = ('ts', 'price', 'mc', 'side_usd', 'side_type', 'trader', '_time')
+
+    def __init__(self, ts, price, supply, side_usd=None, side_type=None, trader=None, time=None):
+        self.ts = ts
+        self.price = price
+        self.mc = price * supply
+        self.side_usd = side_usd
+        self.side_type = side_type
+        self.trader = trader
+        self._time = time
+
+    @classmethod
+    def from_trade(cls, trade, supply):
+        """From a Bitquery trade row"""
+        t = trade['Trade']
+        side = t.get('Side') or {}
+        block_time = trade['Block']['Time']
+        return cls(
+            datetime.fromisoformat(block_time.replace('Z', '+00:00')).timestamp(),
+            float(t.get('PriceInUSD') or 0),
+            supply,
+            float(side['AmountInUSD']) if side.get('AmountInUSD') else None,
+            side.get('Type'),
+            (t.get('Account') or {}).get('Owner'),
+            block_time
+        )
+
+    @property
+    def time(self):
+        """Bitquery-style time string (formatted on demand for archived rows)"""
+        if self._time is None:
+            self._time = format_ts(self.ts)
+        return self._time
+
+
+class Feature:
+    """
+    Online accumulator over a token's trades (ascending by time)
+    context: {'launch_dt', 'launch_ts', 'supply', 'price_source'}
+    per_trade: needs real trades (traders, sides, sizes); reported as
+    None for candle-sourced tokens instead of numbers that look real
+    """
+    name = None
+    per_trade = False
+
+    def __init__(self, context):
+        self.context = context
+
+    def update(self, row):
+        raise NotImplementedError
+
+    def consume(self, columns):
+        """
+        Same state as update() over every row, computed on archive.TradeColumns
+        numpy views (no per-trade Python objects)
+        """
+        raise NotImplementedError
+
+    def result(self):
+        """Fields merged into the enriched token"""
+        raise NotImplementedError
+
+
+@register
+class PriceFeature(Feature):
+    """Launch, peak and final price (trades with a USD price only)"""
+    name = 'price'
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.launch_price = None
+        self.peak_price = None
+        self.peak_time = None
+        self.peak_ts = None
+        self.final_price = None
+
+    def update(self, row):
+        if not row.price:
+            return
+        if self.launch_price is None:
+            self.launch_price = row.price
+        if self.peak_price is None or row.price > self.peak_price:
+            self.peak_price = row.price
+            self.peak_time = row.time
+            self.peak_ts = row.ts
+        self.final_price = row.price
+
+    def consume(self, columns):
+        priced = np.flatnonzero(columns.price)
+        if not len(priced):
+            return
+        prices = columns.price[priced]
+        peak = priced[int(prices.argmax())]
+        self.launch_price = float(prices[0])
+        self.peak_price = float(columns.price[peak])
+        self.peak_ts = float(columns.ts[peak])
+        self.peak_time = format_ts(self.peak_ts)
+        self.final_price = float(prices[-1])
+
+    def result(self):
+        return {
+            'launch_price': self.launch_price,
+            'peak_price': self.peak_price,
+            'peak_time': self.peak_time,
+            'final_price': self.final_price,
+            'time_to_peak_seconds': (
+                self.peak_ts - self.context['launch_ts'] if self.peak_ts is not None else None
+            ),
+        }
+
+
+@register
+class EntryEndFeature(Feature):
+    """
+    When MC first hits entry_end_mc_threshold
+    Falls back to launch + entry_end_fallback_minutes at the launch MC
+    """
+    name = 'entry_end'
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.threshold = config.SUCCESSFUL_TOKEN_CONFIG['entry_end_mc_threshold']
+        self.first_mc = None
+        self.hit = None
+
+    def update(self, row):
+        if self.first_mc is None:
+            self.first_mc = row.mc
+        if self.hit is None and row.mc >= self.threshold:
+            self.hit = row
+
+    def consume(self, columns):
+        if not len(columns):
+            return
+        supply = self.context['supply']
+        mcs = columns.price * supply
+        self.first_mc = float(mcs[0])
+        hits = np.flatnonzero(mcs >= self.threshold)
+        if len(hits):
+            i = hits[0]
+            self.hit = TradeRow(float(columns.ts[i]), float(columns.price[i]), supply)
+
+    def result(self):
+        if self.hit is not None:
+            return {
+                'entry_end_time': self.hit.time,
+                'entry_end_mc': self.hit.mc,
+                'time_to_entry_end_seconds': self.hit.ts - self.context['launch_ts'],
+            }
+
+        fallback_mins = config.SUCCESSFUL_TOKEN_CONFIG['entry_end_fallback_minutes']
+        fallback_dt = self.context['launch_dt'] + timedelta(minutes=fallback_mins)
+        return {
+            'entry_end_time': fallback_dt.strftime(config.DATETIME_FORMAT),
+            'entry_end_mc': self.first_mc or 0,
+            'time_to_entry_end_seconds': None,
+        }
+
+
+@register
+class TradeLiquidityFeature(Feature):
+    """Average and last trade size (liquidity fallback without pool reserves)"""
+    name = 'trade_liquidity'
+    per_trade = True
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.total = 0.0
+        self.count = 0
+        self.last = 0
+
+    def update(self, row):
+        if row.side_usd:
+            self.total += row.side_usd
+            self.count += 1
+            self.last = row.side_usd
+
+    def consume(self, columns):
+        sizes = columns.side_usd[_sized(columns)]
+        self.total = _total(sizes)
+        self.count = len(sizes)
+        self.last = float(sizes[-1]) if len(sizes) else 0
+
+    def result(self):
+        return {
+            'trade_avg_liquidity': self.total / self.count if self.count else 0,
+            'trade_final_liquidity': self.last,
+        }
+
+
+@register
+class DrawdownFeature(Feature):
+    """Deepest drop from a running high before the token's peak"""
+    name = 'drawdown'
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.high = 0.0
+        self.max_drawdown = 0.0
+        self.drawdown_at_peak = 0.0
+
+    def update(self, row):
+        if not row.price:
+            return
+        if row.price > self.high:
+            self.high = row.price
+            # Every drop so far happened before this (new) peak
+            self.drawdown_at_peak = self.max_drawdown
+        elif self.high:
+            self.max_drawdown = max(self.max_drawdown, (self.high - row.price) / self.high * 100)
+
+    def consume(self, columns):
+        prices = columns.price[columns.price != 0]
+        if not len(prices):
+            return
+        # Running high before each trade, and the drop each trade makes from it
+        highs = np.maximum.accumulate(prices)
+        before = np.concatenate(([0.0], highs[:-1]))
+        new_high = prices > before
+        drops = np.where(~new_high & (before > 0), (before - prices) / np.where(before > 0, before, 1) * 100, 0.0)
+        last_high = np.flatnonzero(new_high)[-1]
+        self.high = float(highs[-1])
+        self.max_drawdown = float(drops.max())
+        self.drawdown_at_peak = float(drops[:last_high].max()) if last_high else 0.0
+
+    def result(self):
+        return {'max_drawdown_before_peak_pct': round(self.drawdown_at_peak, 2)}
+
+
+@register
+class BuySellFeature(Feature):
+    """USD volume split by trade side"""
+    name = 'buy_sell'
+    per_trade = True
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.buy = 0.0
+        self.sell = 0.0
+
+    def update(self, row):
+        if not row.side_usd:
+            return
+        if row.side_type == 'buy':
+            self.buy += row.side_usd
+        elif row.side_type == 'sell':
+            self.sell += row.side_usd
+
+    def consume(self, columns):
+        sized = _sized(columns)
+        self.buy = _total(columns.side_usd[sized & (columns.side == 1)])
+        self.sell = _total(columns.side_usd[sized & (columns.side == -1)])
+
+    def result(self):
+        return {
+            'buy_volume_usd': round(self.buy, 2),
+            'sell_volume_usd': round(self.sell, 2),
+            'buy_sell_ratio': round(self.buy / self.sell, 4) if self.sell else None,
+        }
+
+
+@register
+class BurstFeature(Feature):
+    """Most trades inside any burst_seconds sliding window"""
+    name = 'bursts'
+    per_trade = True
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.span = config.FEATURES_CONFIG['burst_seconds']
+        self.window = deque()
+        self.max_trades = 0
+        self.max_ts = None
+
+    def update(self, row):
+        self.window.append(row.ts)
+        while self.window[0] <= row.ts - self.span:
+            self.window.popleft()
+        if len(self.window) > self.max_trades:
+            self.max_trades = len(self.window)
+            self.max_ts = row.ts
+
+    def consume(self, columns):
+        if not len(columns):
+            return
+        # Trades inside (ts - span, ts] ending at each trade
+        ts = columns.ts
+        counts = np.arange(1, len(ts) + 1) - np.searchsorted(ts, ts - self.span, side='right')
+        i = int(counts.argmax())
+        self.max_trades = int(counts[i])
+        self.max_ts = float(ts[i])
+
+    def result(self):
+        return {
+            'max_burst_trades': self.max_trades,
+            'max_burst_seconds_after_launch': (
+                self.max_ts - self.context['launch_ts'] if self.max_ts is not None else None
+            ),
+        }
+
+
+@register
+class UniqueTradersFeature(Feature):
+    """Distinct trader wallets overall and in the first N minutes after launch"""
+    name = 'unique_traders'
+    per_trade = True
+
+    def __init__(self, context):
+        super().__init__(context)
+        self.windows = config.FEATURES_CONFIG['trader_windows_minutes']
+        self.traders = set()
+        self.by_window = {minutes: set() for minutes in self.windows}
+
+    def update(self, row):
+        if not row.trader:
+            return
+        self.traders.add(row.trader)
+        elapsed = row.ts - self.context['launch_ts']
+        for minutes, traders in self.by_window.items():
+            if elapsed <= minutes * 60:
+                traders.add(row.trader)
+
+    def consume(self, columns):
+        known = columns.trader != 0
+        elapsed = columns.ts - self.context['launch_ts']
+        self.traders = set(np.unique(columns.trader[known]).tolist())
+        for minutes in self.by_window:
+            self.by_window[minutes] = set(np.unique(columns.trader[known & (elapsed <= minutes * 60)]).tolist())
+
+    def result(self):
+        fields = {'unique_traders': len(self.traders)}
+        for minutes, traders in self.by_window.items():
+            fields[f'unique_traders_{minutes}m'] = len(traders)
+        return fields
+
+
+def _sized(columns):
+    """Trades with a known, non-zero USD size (same test as row.side_usd truthiness)"""
+    return ~np.isnan(columns.side_usd) & (columns.side_usd != 0)
+
+
+def _total(values):
+    """Sum in trade order (cumsum is sequential, so it matches update() exactly)"""
+    return float(np.cumsum(values)[-1]) if len(values) else 0.0
+
+
+class FeatureEngine:
+    """Runs the core features plus FEATURES_CONFIG['enabled'] in a single pass"""
+
+    def __init__(self, names=None):
+        names = names if names is not None else config.FEATURES_CONFIG['enabled']
+        self.names = CORE_FEATURES + [name for name in names if name not in CORE_FEATURES]
+        unknown = [name for name in self.names if name not in FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(unknown)}")
+
+    def compute(self, trades, launch_dt, supply):
+        """
+        All registered features for one token's trades
+        trades: Bitquery trade rows or archive.TradeColumns
+        """
+        context = {
+            'launch_dt': launch_dt,
+            'launch_ts': launch_dt.timestamp(),
+            'supply': int(supply),
+            'price_source': price_source(trades),
+        }
+        features = [FEATURES[name](context) for name in self.names]
+        
+        # Candle rows only carry prices; per-trade features come out as None
+        unavailable = []
+        if context['price_source'] == 'candles':
+            unavailable = [feature for feature in features if feature.per_trade]
+            features = [feature for feature in features if not feature.per_trade]
+
+        # Archived tokens come as column views and are computed on them
+        # directly; fresh ones are Bitquery rows, parsed once and streamed
+        if hasattr(trades, 'rows'):
+            for feature in features:
+                feature.consume(trades)
+        else:
+            rows = (TradeRow.from_trade(trade, context['supply']) for trade in trades)
+            for row in rows:
+                for feature in features:
+                    feature.update(row)
+
+        fields = {'price_source': context['price_source']}
+        for feature in unavailable:
+            fields.update({key: None for key in feature.result()})
+        for feature in features:
+            fields.update(feature.result())
+        return fields
@@ -0,0 +1,68 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Holder Snapshot Engine - Top holders and holder count at holder_snapshot time
+Many mints per query, batches run concurrently, results cached
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+
+class HolderSnapshotEngine:
+
+    def __init__(self, bitquery_client):
+        self.bitquery = bitquery_client
+
+    def _key(self, token_address, snapshot_datetime):
+        return ('holders', token_address, snapshot_datetime.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+    def snapshot(self, snapshots, supplies):
+        """
+        Holder snapshot for every mint
+        snapshots: {token_address: snapshot_datetime}
+        supplies: {token_address: total supply} for holder percentages
+        Returns {token_address: {'holder_count', 'holder_count_capped', 'top_holders'}}
+        """
+        results = {}
+        missing = {}
+        for token_address, snapshot_dt in snapshots.items():
+            cached = self.bitquery.cache.results.get(self._key(token_address, snapshot_dt))
+            self.bitquery.metrics.record_cache("holders", cached is not None)
+            if cached is None:
+                missing[token_address] = snapshot_dt
+            else:
+                results[token_address] = cached
+
+        mints = list(missing)
+        batch_size = config.HOLDERS_CONFIG['batch_size']
+        batches = [
+            {mint: missing[mint] for mint in mints[i:i + batch_size]}
+            for i in range(0, len(mints), batch_size)
+        ]
+
+        if batches:
+            with ThreadPoolExecutor(max_workers=config.HOLDERS_CONFIG['concurrency']) as pool:
+                for batch, balances in zip(batches, pool.map(self.bitquery.get_holder_balances, batches)):
+                    if balances is None:
+                        continue
+                    for token_address, holders in balances.items():
+                        snapshot = self._summarize(holders, supplies.get(token_address))
+                        self.bitquery.cache.results.set(self._key(token_address, batch[token_address]), snapshot)
+                        results[token_address] = snapshot
+
+        return results
+
+    def _summarize(self, holders, supply):
+        top = holders[:config.HOLDERS_CONFIG['top_holders']]
+        return {
+            'holder_count': len(holders),
+            'holder_count_capped': len(holders) >= config.HOLDERS_CONFIG['max_holders'],
+            'top_holders': [
+                {
+                    'owner': owner,
+                    'balance': balance,
+                    'percentage': round(balance / supply * 100, 4) if supply else None
+                }
+                for owner, balance in top
+            ],
+        }
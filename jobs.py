@@ -0,0 +1,177 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Jobs - Background execution of tracker runs
+Runs keep going across Streamlit reruns; the page polls for progress
+and partial results while tokens are classified
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+
+class Job:
+    """State of one tracker run, updated from the worker thread"""
+
+    def __init__(self, key, final_at=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.final_at = final_at        # Unix time after which the run's results stop changing
+        self.status = 'queued'          # queued, running, done, error
+        self.progress = (0, 0, "Queued...")
+        self.successful = []
+        self.failed = []
+        self.result = None              # (successful, failed, summary, downloads, date_label)
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update_progress(self, current, total, message):
+        with self._lock:
+            self.progress = (current, total, message)
+
+    def add_token(self, category, token):
+        """Token callback: collect classified tokens as they arrive"""
+        with self._lock:
+            if category == 'successful':
+                self.successful.append(token)
+            elif category == 'failed':
+                self.failed.append(token)
+
+    def snapshot(self):
+        """Consistent copy of the job state for rendering"""
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "progress": self.progress,
+                "successful": list(self.successful),
+                "failed": list(self.failed),
+                "result": self.result,
+                "error": self.error,
+                "elapsed": (self.finished_at or time.time()) - self.started_at,
+            }
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    @property
+    def reusable(self):
+        """
+        Finished with saved results (empty or failed runs are retried)
+        Runs that finished while tracking windows were still open are only
+        reused for JOBS_CONFIG['reuse_seconds']
+        """
+        with self._lock:
+            if self.status != 'done' or self.result is None or self.result[3] is None:
+                return False
+            if self.final_at is None or self.finished_at >= self.final_at:
+                return True
+            return time.time() - self.finished_at < config.JOBS_CONFIG['reuse_seconds']
+
+
+class JobManager:
+    """
+    Process-wide executor for tracker runs
+    Submitting a key that is already running (or finished with results)
+    returns the existing job instead of starting a new one
+    """
+
+    def __init__(self, max_workers=None, max_jobs=None):
+        self.max_jobs = max_jobs or config.JOBS_CONFIG['max_jobs']
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or config.JOBS_CONFIG['max_workers'],
+            thread_name_prefix="tracker-job"
+        )
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, final_at=None):
+        """
+        Run fn(job) in the background; fn returns the job result
+        final_at: when the window's results become final (see Job.reusable)
+        """
+        with self._lock:
+            existing = self._by_key.get(key)
+            if existing is not None and (existing.active or existing.reusable):
+                return existing
+
+            job = Job(key, final_at)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._evict()
+
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn):
+        with job._lock:
+            job.status = 'running'
+        try:
+            result = fn(job)
+            with job._lock:
+                job.result = result
+                job.finished_at = time.time()
+                job.status = 'done'
+        except Exception as e:
+            print(f"❌ Job {job.id} failed: {e}")
+            with job._lock:
+                job.error = str(e)
+                job.finished_at = time.time()
+                job.status = 'error'
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond max_jobs"""
+        finished = [j for j in self._jobs.values() if not j.active]
+        finished.sort(key=lambda j: j.started_at)
+        while len(self._jobs) > self.max_jobs and finished:
+            job = finished.pop(0)
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+
+def run_tracker(job, api_token, cache, start_datetime, end_datetime, date_label, profile=None):
+    """Job body: process the window, save the JSON files, return everything to render"""
+    # Imported here so the app only loads requests/pyarrow/the pipeline once a run starts
+    from bitquery_client import BitqueryClient
+    from processor import TokenProcessor
+    
+    bitquery = BitqueryClient(api_token, cache=cache)
+    processor = TokenProcessor(bitquery)
+
+    job.update_progress(0, 0, "Fetching token launches from Bitquery...")
+    try:
+        successful, failed, summary = processor.process_tokens_for_timerange(
+            start_datetime,
+            end_datetime,
+            progress_callback=job.update_progress,
+            token_callback=job.add_token,
+            profile=profile
+        )
+    finally:
+        bitquery.close()        # Finishes a recording
+
+    downloads = None
+    if summary.get('total_tokens_analyzed', 0) > 0:
+        job.update_progress(1, 1, "Saving JSON files...")
+        paths = processor.save_to_json_files(successful, failed, summary, date_label)
+        # Files are named per date, so a later run of another window on the
+        # same date overwrites them: the job keeps its own bytes
+        downloads = tuple(_read_bytes(path) for path in paths)
+
+    return successful, failed, summary, downloads, date_label
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,68 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Liquidity Engine - Pool reserve liquidity for many tokens per request
+Fetches bonding-curve / pool quote reserves at each token's window end
+in batched queries and caches them in the client's shared cache
+avg_liquidity is aggregated over the whole tracking window; the series
+keeps the latest LIQUIDITY_CONFIG['series_points'] updates
+"""
+
+import config
+from cache import window_ttl
+
+
+class LiquidityEngine:
+
+    def __init__(self, bitquery_client):
+        self.bitquery = bitquery_client
+        self.failed = set()         # Mints whose batch failed (trade-size fallback is flagged)
+
+    def _key(self, token_address, end_datetime):
+        return ('liquidity', token_address, end_datetime.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+    def prefetch(self, windows):
+        """
+        Load liquidity for every mint not cached yet
+        windows: {token_address: (start_datetime, end_datetime)}
+        Costs one request per LIQUIDITY_CONFIG['batch_size'] mints
+        """
+        missing = {}
+        for token_address, window in windows.items():
+            cached = self.bitquery.cache.results.get(self._key(token_address, window[1]))
+            self.bitquery.metrics.record_cache("liquidity", cached is not None)
+            if cached is None:
+                missing[token_address] = window
+
+        mints = list(missing)
+        batch_size = config.LIQUIDITY_CONFIG['batch_size']
+        for i in range(0, len(mints), batch_size):
+            batch = {mint: missing[mint] for mint in mints[i:i + batch_size]}
+            series_by_mint = self.bitquery.get_pool_liquidity(batch)
+            stats = self.bitquery.get_pool_liquidity_stats(batch) if series_by_mint is not None else None
+            if stats is None:
+                self.failed.update(batch)
+                continue
+
+            for token_address, series in series_by_mint.items():
+                self.failed.discard(token_address)
+                self.bitquery.cache.results.set(
+                    self._key(token_address, batch[token_address][1]),
+                    self._summarize(series, stats.get(token_address)),
+                    window_ttl(batch[token_address][1])
+                )
+
+    def get(self, token_address, end_datetime):
+        """Cached liquidity for a mint, or None if unavailable"""
+        liquidity = self.bitquery.cache.results.get(self._key(token_address, end_datetime))
+        if not liquidity or not liquidity['series']:
+            return None
+        return liquidity
+
+    def _summarize(self, series, stats):
+        values = [usd for _, usd in series]
+        return {
+            'final_liquidity': values[-1] if values else 0,
+            'avg_liquidity': stats['avg_liquidity'] if stats else 0,
+            'updates': stats['updates'] if stats else 0,
+            'series': series,
+        }
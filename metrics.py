@@ -0,0 +1,271 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Metrics - Instrumentation for API calls and processing stages
+Collects latencies, bytes, retries, cache hits and drop reasons per run
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+
+class Histogram:
+    """Cumulative bucket histogram (Prometheus style)"""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0,
+            "buckets": {str(b): c for b, c in zip(self.buckets, self.counts)}
+        }
+
+
+class Metrics:
+    """Thread-safe registry shared by BitqueryClient and TokenProcessor"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all collected values (start of a new run)"""
+        with self._lock:
+            self.latency = {}           # query_type -> Histogram
+            self.requests = {}          # query_type -> count
+            self.errors = {}            # query_type -> count
+            self.failures = {}          # query_type -> requests given up on (final outcome)
+            self.retries = {}           # query_type -> count
+            self.bytes_received = {}    # query_type -> bytes
+            self.cache_hits = {}        # cache name -> hits
+            self.cache_misses = {}      # cache name -> misses
+            self.stage_seconds = {}     # stage -> seconds
+            self.dropped = {}           # reason -> count
+
+    # ----- API calls -----
+
+    def observe_request(self, query_type, seconds, nbytes, ok=True):
+        with self._lock:
+            hist = self.latency.get(query_type)
+            if hist is None:
+                hist = self.latency[query_type] = Histogram(config.METRICS_CONFIG['latency_buckets'])
+            hist.observe(seconds)
+            self.requests[query_type] = self.requests.get(query_type, 0) + 1
+            self.bytes_received[query_type] = self.bytes_received.get(query_type, 0) + nbytes
+            if not ok:
+                self.errors[query_type] = self.errors.get(query_type, 0) + 1
+
+    def record_error(self, query_type):
+        """A request that got HTTP 200 but failed (GraphQL errors, bad payload)"""
+        with self._lock:
+            self.errors[query_type] = self.errors.get(query_type, 0) + 1
+
+    def record_failure(self, query_type):
+        """A request whose result was lost after retries (HTTP, GraphQL or decode error)"""
+        with self._lock:
+            self.failures[query_type] = self.failures.get(query_type, 0) + 1
+
+    def record_retry(self, query_type):
+        with self._lock:
+            self.retries[query_type] = self.retries.get(query_type, 0) + 1
+
+    # ----- Caches -----
+
+    def record_cache(self, cache_name, hit):
+        with self._lock:
+            target = self.cache_hits if hit else self.cache_misses
+            target[cache_name] = target.get(cache_name, 0) + 1
+
+    # ----- Stages and drops -----
+
+    def add_stage_time(self, stage, seconds):
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage):
+        """Time a processing stage (discovery, fetch, enrich, categorize, save)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(stage, time.perf_counter() - started)
+
+    def record_drop(self, reason, count=1):
+        with self._lock:
+            self.dropped[reason] = self.dropped.get(reason, 0) + count
+
+    # ----- Export -----
+
+    def snapshot(self):
+        """Plain dict of everything collected so far"""
+        with self._lock:
+            caches = {}
+            for name in set(self.cache_hits) | set(self.cache_misses):
+                hits = self.cache_hits.get(name, 0)
+                misses = self.cache_misses.get(name, 0)
+                caches[name] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0
+                }
+
+            return {
+                "requests": {
+                    qt: {
+                        "count": self.requests.get(qt, 0),
+                        "errors": self.errors.get(qt, 0),
+                        "failed": self.failures.get(qt, 0),
+                        "retries": self.retries.get(qt, 0),
+                        "bytes_received": self.bytes_received.get(qt, 0),
+                        "latency_seconds": hist.to_dict()
+                    }
+                    for qt, hist in self.latency.items()
+                },
+                "caches": caches,
+                "stage_seconds": {k: round(v, 4) for k, v in self.stage_seconds.items()},
+                "tokens_dropped": dict(self.dropped)
+            }
+
+
+# ============================================
+# SINKS
+# ============================================
+
+class JsonSummarySink:
+    """Appends the metrics snapshot to the run's summary JSON file"""
+
+    def export(self, metrics, summary_file=None):
+        if not summary_file:
+            return
+
+        with open(summary_file, 'r') as f:
+            summary = json.load(f)
+
+        summary['metrics'] = metrics.snapshot()
+
+        with open(summary_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+# Metrics of the most recent export, served by the /metrics endpoint
+# (sinks are rebuilt on every save, the HTTP server lives for the process)
+_latest = {'metrics': None}
+
+
+class PrometheusSink:
+    """Renders metrics in Prometheus text format, optionally served over HTTP"""
+
+    _server = None
+
+    def __init__(self, port=None, host='127.0.0.1'):
+        self.port = port
+        self.host = host
+
+    def export(self, metrics, summary_file=None):
+        _latest['metrics'] = metrics
+        if self.port and PrometheusSink._server is None:
+            self._serve()
+
+    def render(self, metrics=None):
+        snap = (metrics or _latest['metrics'] or Metrics()).snapshot()
+        lines = []
+
+        lines.append("# TYPE tracker_request_latency_seconds histogram")
+        for qt, req in snap['requests'].items():
+            hist = req['latency_seconds']
+            for bound, count in hist['buckets'].items():
+                lines.append(f'tracker_request_latency_seconds_bucket{{query_type="{qt}",le="{bound}"}} {count}')
+            lines.append(f'tracker_request_latency_seconds_bucket{{query_type="{qt}",le="+Inf"}} {hist["count"]}')
+            lines.append(f'tracker_request_latency_seconds_sum{{query_type="{qt}"}} {hist["sum"]}')
+            lines.append(f'tracker_request_latency_seconds_count{{query_type="{qt}"}} {hist["count"]}')
+
+        for name, key in (("requests_total", "count"), ("request_errors_total", "errors"),
+                          ("request_failures_total", "failed"), ("request_retries_total", "retries"),
+                          ("bytes_received_total", "bytes_received")):
+            lines.append(f"# TYPE tracker_{name} counter")
+            for qt, req in snap['requests'].items():
+                lines.append(f'tracker_{name}{{query_type="{qt}"}} {req[key]}')
+
+        lines.append("# TYPE tracker_cache_hits_total counter")
+        lines.append("# TYPE tracker_cache_misses_total counter")
+        for cache, stats in snap['caches'].items():
+            lines.append(f'tracker_cache_hits_total{{cache="{cache}"}} {stats["hits"]}')
+            lines.append(f'tracker_cache_misses_total{{cache="{cache}"}} {stats["misses"]}')
+
+        lines.append("# TYPE tracker_stage_seconds_total counter")
+        for stage, seconds in snap['stage_seconds'].items():
+            lines.append(f'tracker_stage_seconds_total{{stage="{stage}"}} {seconds}')
+
+        lines.append("# TYPE tracker_tokens_dropped_total counter")
+        for reason, count in snap['tokens_dropped'].items():
+            lines.append(f'tracker_tokens_dropped_total{{reason="{reason}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+    def _serve(self):
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = sink.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            print(f"⚠️ Could not start metrics endpoint on {self.host}:{self.port}: {e}")
+            return
+
+        PrometheusSink._server = server
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics endpoint: http://{self.host}:{self.port}/metrics")
+
+
+SINKS = {
+    'json': JsonSummarySink,
+    'prometheus': PrometheusSink,
+}
+
+
+def build_sinks():
+    """Create the sinks listed in config.METRICS_CONFIG['sinks']"""
+    sinks = []
+    for name in config.METRICS_CONFIG['sinks']:
+        if name == 'prometheus':
+            sinks.append(PrometheusSink(
+                config.METRICS_CONFIG.get('prometheus_port'),
+                config.METRICS_CONFIG.get('prometheus_host', '127.0.0.1')
+            ))
+        elif name in SINKS:
+            sinks.append(SINKS[name]())
+        else:
+            print(f"⚠️ Unknown metrics sink: {name}")
+    return sinks
@@ -0,0 +1,255 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Query Planner - API point estimates and budget enforcement
+Bitquery bills in points. Every request is charged against a per-run and
+a per-day budget, and before a run fetches any trades the planner probes
+trade activity, picks the cheapest way to fetch each token and keeps the
+most promising tokens when the budget can't cover all of them.
+"""
+
+import threading
+from datetime import datetime, timezone
+import config
+from db import connect, create
+
+# How a token's trades get fetched, cheapest first
+STRATEGIES = ['archive', 'cache', 'batched', 'raw', 'candles']
+
+RAW_TRADE_LIMIT = 1000          # Row limit of the single-mint trades query
+
+
+def query_points(query_type, nbytes=0):
+    """Points for one request: base cost of the query type + response size"""
+    cfg = config.BUDGET_CONFIG
+    base = cfg['query_points'].get(query_type, cfg['default_query_points'])
+    if not base:
+        return 0.0                  # Not a Bitquery request (e.g. Solscan)
+    return base + cfg['points_per_kb'] * nbytes / 1024
+
+
+def estimate_points(query_type, rows=0, share=1.0):
+    """
+    Expected points for rows of a query
+    share: this token's part of the base cost when many mints share a request
+    """
+    cfg = config.BUDGET_CONFIG
+    base = cfg['query_points'].get(query_type, cfg['default_query_points'])
+    return base * share + cfg['points_per_kb'] * rows * cfg['row_kb'].get(query_type, 0)
+
+
+def _today():
+    return datetime.now(timezone.utc).strftime(config.DATE_FORMAT)
+
+
+class PointLedger:
+    """Points spent per UTC day, shared by every process using the same file"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.BUDGET_CONFIG['ledger_path']
+        create(self.db_path, "CREATE TABLE IF NOT EXISTS spend (day TEXT PRIMARY KEY, points REAL NOT NULL);")
+
+    def add(self, points, day=None):
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO spend (day, points) VALUES (?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET points = points + excluded.points",
+                (day or _today(), points)
+            )
+
+    def spent(self, day=None):
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT points FROM spend WHERE day = ?", (day or _today(),)).fetchone()
+        return row[0] if row else 0.0
+
+
+class PointBudget:
+    """
+    Points charged by one client (one run at a time)
+    Limits come from BUDGET_CONFIG; None means unlimited
+    """
+
+    def __init__(self, run_points=None, daily_points=None, ledger=None):
+        cfg = config.BUDGET_CONFIG
+        self.run_points = run_points if run_points is not None else cfg['run_points']
+        self.daily_points = daily_points if daily_points is not None else cfg['daily_points']
+        self._ledger = ledger
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def ledger(self):
+        # Opened on first use so clients without a daily limit never touch disk
+        if self._ledger is None and self.daily_points:
+            self._ledger = PointLedger()
+        return self._ledger
+
+    def reset(self):
+        with self._lock:
+            self.spent = 0.0
+            self.by_query = {}
+
+    def charge(self, query_type, nbytes=0):
+        """Record the points of one completed request"""
+        points = query_points(query_type, nbytes)
+        if not points:
+            return 0.0
+
+        with self._lock:
+            self.spent += points
+            self.by_query[query_type] = self.by_query.get(query_type, 0.0) + points
+        if self.ledger:
+            self.ledger.add(points)
+        return points
+
+    def remaining(self):
+        """Points left under the tighter of the run and daily limits"""
+        left = float('inf')
+        if self.run_points:
+            left = min(left, self.run_points - self.spent)
+        if self.daily_points:
+            left = min(left, self.daily_points - self.ledger.spent())
+        return max(left, 0.0)
+
+    def allows(self, points):
+        return points <= self.remaining()
+
+    def snapshot(self):
+        return {
+            "spent": round(self.spent, 1),
+            "run_limit": self.run_points,
+            "daily_spent": round(self.ledger.spent(), 1) if self.ledger else None,
+            "daily_limit": self.daily_points,
+            "by_query": {name: round(points, 1) for name, points in sorted(self.by_query.items())},
+        }
+
+
+class QueryPlanner:
+    """Chooses a fetch strategy per token and trims the run to the budget"""
+
+    def __init__(self, bitquery_client, archive=None):
+        self.bitquery = bitquery_client
+        self.archive = archive          # TradeArchive with final trades of earlier runs
+        self.last_plan = None
+
+    def plan(self, tokens, windows):
+        """
+        tokens: launches in processing order
+        windows: {token_address: (start_datetime, end_datetime)}
+        Returns (planned, dropped) where planned is [(token, strategy, est_points)]
+        in the original order and dropped lists (token, reason)
+        """
+        cfg = config.BUDGET_CONFIG
+        if not cfg['enabled']:
+            self.last_plan = None
+            return [(token, 'raw', 0.0) for token in tokens], []
+
+        activity = self._probe(tokens, windows)
+
+        candidates = []
+        dropped = []
+        for order, token in enumerate(tokens):
+            token_address = token['token_address']
+            stats = activity.get(token_address)
+            strategy = self._strategy(token_address, windows[token_address], stats)
+
+            if strategy is None:
+                dropped.append((token, 'no_trades'))
+                continue
+
+            points = self._estimate(strategy, windows[token_address], stats)
+            # Most promising first: USD volume, then trade count, then launch order
+            priority = (-(stats or {}).get('volume', 0), -(stats or {}).get('trades', 0), order)
+            candidates.append((priority, order, token, strategy, points))
+
+        # Fill the budget with the most promising tokens,
+        # keeping enough for the run's fixed batched queries
+        remaining = self.bitquery.budget.remaining() - self._fixed_points()
+        selected = []
+        for priority, order, token, strategy, points in sorted(candidates, key=lambda c: c[0]):
+            if points <= remaining:
+                remaining -= points
+                selected.append((order, token, strategy, points))
+            else:
+                dropped.append((token, 'over_budget'))
+
+        planned = [(token, strategy, points) for _, token, strategy, points in sorted(selected, key=lambda s: s[0])]
+
+        self.last_plan = {
+            "strategies": {name: sum(1 for p in planned if p[1] == name) for name in STRATEGIES},
+            "estimated_points": round(sum(p[2] for p in planned), 1),
+            "activity_probe": bool(activity),
+            "skipped_no_trades": sum(1 for _, reason in dropped if reason == 'no_trades'),
+            "dropped_over_budget": sum(1 for _, reason in dropped if reason == 'over_budget'),
+        }
+        print(f"🧮 Query plan: {self.last_plan['strategies']} "
+              f"~{self.last_plan['estimated_points']:.0f} points, "
+              f"{self.last_plan['dropped_over_budget']} tokens over budget")
+
+        return planned, dropped
+
+    def _fixed_points(self):
+        """Base cost of the batched per-run queries (liquidity, dev activity, holders)"""
+        query_types = ['pool_liquidity', 'pool_liquidity_avg']
+        if config.FAILED_TOKEN_CONFIG['dev_dump']['enabled']:
+            query_types.append('creator_trades')
+        if config.HOLDERS_CONFIG['enabled']:
+            query_types.append('holder_balances')
+        return sum(estimate_points(query_type) for query_type in query_types)
+
+    def _probe(self, tokens, windows):
+        """Trade count and USD volume per mint, {} when the probe is unavailable"""
+        uncached = [
+            t['token_address'] for t in tokens
+            if not self._stored(t['token_address'], windows[t['token_address']])
+        ]
+        activity = {}
+        batch_size = config.BUDGET_CONFIG['probe_batch_size']
+        for i in range(0, len(uncached), batch_size):
+            batch = {mint: windows[mint] for mint in uncached[i:i + batch_size]}
+            counts = self.bitquery.get_trade_activity(batch)
+            if counts is None:
+                return {}
+            activity.update(counts)
+        return activity
+
+    def _stored(self, token_address, window):
+        """
+        'archive' or 'cache' when the trades are already on hand, else None
+        Replays skip the archive: the recorded trade queries are what they measure
+        """
+        if self.archive is not None and not self.bitquery.replaying and self.archive.has(token_address, *window):
+            return 'archive'
+        if self.bitquery.cached_price_history(token_address, *window) is not None:
+            return 'cache'
+        return None
+
+    def _strategy(self, token_address, window, stats):
+        """Cheapest strategy for one token, None when it had no trades at all"""
+        cfg = config.BUDGET_CONFIG
+        stored = self._stored(token_address, window)
+        if stored:
+            return stored
+        if stats is None:
+            return 'raw'
+        if stats['trades'] == 0:
+            return None
+        if stats['trades'] <= cfg['batch_max_trades']:
+            return 'batched'
+        if stats['trades'] >= cfg['candle_min_trades']:
+            return 'candles'
+        return 'raw'
+
+    def _estimate(self, strategy, window, stats):
+        """Expected points to fetch and enrich one token"""
+        cfg = config.BUDGET_CONFIG
+        trades = stats['trades'] if stats else cfg['default_expected_trades']
+        extras = cfg['extra_points_per_token']
+
+        if strategy in ('archive', 'cache'):
+            return extras
+        if strategy == 'batched':
+            return extras + estimate_points('price_batch', trades, 1 / cfg['batch_size'])
+        if strategy == 'candles':
+            minutes = (window[1] - window[0]).total_seconds() / cfg['candle_interval_seconds']
+            return extras + estimate_points('price_candles', min(trades, minutes))
+        return extras + estimate_points('price_history', min(trades, RAW_TRADE_LIMIT))
@@ -3,72 +3,234 @@
 Token Processor - Categorizes and formats tokens according to your criteria
 """
 
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 import json
 import os
+import time
 import config
+import metrics as metrics_module
+from profiler import Profiler, phase
+from store import TokenStore
+from rollups import RollupStore
+import export
+from liquidity import LiquidityEngine
+from holders import HolderSnapshotEngine
+from dev_activity import DevActivityEngine
+from planner import QueryPlanner
+from features import FeatureEngine, price_source
+from registry import WindowRegistry
+from archive import TradeArchive
+
+# Requests whose failure leaves launches, trades or side lookups missing
+# (a failed activity probe, batch prefetch or supply lookup falls back to
+# an equivalent query or the default supply)
+DEGRADING_QUERIES = (
+    'token_launches', 'price_history', 'price_candles',
+    'pool_liquidity', 'pool_liquidity_avg', 'creator_trades', 'holder_balances',
+)
+
 
 class TokenProcessor:
     
     def __init__(self, bitquery_client):
         self.bitquery = bitquery_client
+        self.metrics = bitquery_client.metrics
+        self.liquidity = LiquidityEngine(bitquery_client)
+        self.holders = HolderSnapshotEngine(bitquery_client)
+        self.dev_activity = DevActivityEngine(bitquery_client)
+        self.archive = TradeArchive() if config.ARCHIVE_CONFIG['enabled'] else None
+        self.planner = QueryPlanner(bitquery_client, self.archive)
+        self.features = FeatureEngine()
+        self.registry = WindowRegistry() if config.REGISTRY_CONFIG['enabled'] else None
+        self.budget = bitquery_client.budget
+        self.enriched_tokens = []       # Enriched tokens of the last run
+        self.trade_series = {}          # token_address -> trades (columnar export only)
+        self.window = None              # (start, end) of the last run
+        self.incomplete = []            # Why the last run may have missed tokens (empty when complete)
     
-    def process_tokens_for_timerange(self, start_datetime, end_datetime, progress_callback=None):
+    def process_tokens_for_timerange(self, start_datetime, end_datetime, progress_callback=None,
+                                     token_callback=None, profile=None):
         """
         Main processing function
         Gets all tokens from timerange and categorizes them
+        token_callback(category, token): called as each token is classified
+        ('successful' or 'failed'), before the final per-category limits
+        profile: capture CPU samples and per-token spans (defaults to config)
         """
+        if profile is None:
+            profile = config.PROFILING_CONFIG['enabled']
+        
+        if not profile:
+            return self._process_tokens(start_datetime, end_datetime, progress_callback, token_callback)
+        
+        profiler = Profiler()
+        profiler.start()
+        try:
+            successful, failed, summary = self._process_tokens(
+                start_datetime, end_datetime, progress_callback, token_callback, profiler
+            )
+        finally:
+            profiler.stop()
+        
+        cpu_file, spans_file = profiler.write_files(start_datetime.strftime(config.DATE_FORMAT))
+        summary['profiling'] = {
+            "cpu_profile": cpu_file,
+            "span_profile": spans_file,
+            "slowest_tokens": profiler.slowest_tokens()
+        }
+        print(f"🔬 Profile written: {cpu_file}")
+        
+        return successful, failed, summary
+    
+    def _process_tokens(self, start_datetime, end_datetime, progress_callback=None,
+                        token_callback=None, profiler=None):
+        """Discovery, fetch, enrich and categorize for one time range"""
         print(f"📅 Processing tokens from {start_datetime} to {end_datetime}...")
+        self.metrics.reset()
+        self.budget.reset()
+        self.enriched_tokens = []
+        self.trade_series = {}
+        self.window = (start_datetime, end_datetime)
+        self.incomplete = []
         
         # Step 1: Get all launches in UI window
-        tokens = self.bitquery.get_tokens_launched_in_timerange(start_datetime, end_datetime)
-        print(f"✅ Found {len(tokens)} token launches")
-        
-        if not tokens:
+        # Earlier overlapping runs are reused: only uncovered launch ranges are
+        # discovered and only mints not enriched before are fetched
+        with self.metrics.stage("discovery"):
+            reused, ranges = self._reusable(start_datetime, end_datetime)
+            tokens = []
+            for range_start, range_end in ranges:
+                found, range_complete = self.bitquery.discover_launches(range_start, range_end)
+                tokens.extend(found)
+                if not range_complete:
+                    self._incomplete("launch_discovery")
+            tokens = self._new_launches(tokens, reused)
+        print(f"✅ Found {len(tokens)} token launches ({len(reused)} reused from earlier runs)")
+        
+        if reused and token_callback:
+            for token in reused:
+                self._emit_token(token, token_callback)
+        
+        if not tokens and not reused:
             print("⚠️ No tokens found in this time range")
-            return [], [], self._generate_empty_summary(start_datetime, end_datetime)
+            self._record_window(ranges, [])
+            return [], [], self._add_budget(self._generate_empty_summary(start_datetime, end_datetime))
         
         # Limit processing if too many tokens
         if len(tokens) > config.MAX_TOKENS_TO_PROCESS:
             print(f"⚠️ Found {len(tokens)} tokens, limiting to {config.MAX_TOKENS_TO_PROCESS}")
+            self.metrics.record_drop("over_token_limit", len(tokens) - config.MAX_TOKENS_TO_PROCESS)
             tokens = tokens[:config.MAX_TOKENS_TO_PROCESS]
+            self._incomplete("over_token_limit")
         
-        # Step 2: Track each token for configured hours from launch
+        # Step 2: Pick a fetch strategy per token within the API point budget
+        with self.metrics.stage("plan"):
+            planned, dropped = self.planner.plan(
+                tokens, {token['token_address']: self._tracking_window(token) for token in tokens}
+            )
+        for _, reason in dropped:
+            self.metrics.record_drop(reason)
+            if reason == 'over_budget':
+                self._incomplete("over_budget")
+        
+        # Step 3: Track each token for configured hours from launch
+        # Tokens go in batches of BATCH_SIZE so per-mint extras (pool liquidity)
+        # are fetched for the whole batch in a few requests
         enriched_tokens = []
-        total = len(tokens)
+        total = len(planned)
         
-        for i, token in enumerate(tokens, 1):
-            # Progress update
-            if progress_callback:
-                progress_callback(i, total, f"Processing token {i}/{total}")
+        for batch_start in range(0, total, config.BATCH_SIZE):
+            batch = planned[batch_start:batch_start + config.BATCH_SIZE]
+            fetched = []
             
-            # Calculate tracking window from launch (using config)
-            launch_dt = datetime.fromisoformat(token['launch_time'].replace('Z', '+00:00'))
-            track_end_dt = launch_dt + timedelta(hours=config.ANALYSIS_WINDOW['tracking_duration_hours'])
+            # Quiet tokens share multi-mint trade queries
+            self._prefetch_batched([token for token, strategy, _ in batch if strategy == 'batched'])
             
-            # Get price history for this token's tracking window
-            trades = self.bitquery.get_token_price_history(
-                token['token_address'],
-                launch_dt,
-                track_end_dt
-            )
+            for i, (token, strategy, points) in enumerate(batch, batch_start + 1):
+                # Progress update
+                if progress_callback:
+                    progress_callback(i, total, f"Processing token {i}/{total}")
+                
+                # Estimates can be off; stop spending once the budget is gone
+                if not self.budget.allows(points):
+                    self.metrics.record_drop("over_budget")
+                    self._incomplete("over_budget")
+                    continue
+                
+                with self._token_span(profiler, token):
+                    trades = self._fetch_token(token, strategy)
+                if trades:
+                    fetched.append((token, trades))
+            
+            if not fetched:
+                continue
             
-            if trades:
-                enriched = self._enrich_token_data(token, trades)
+            with self.metrics.stage("liquidity"):
+                self.liquidity.prefetch({token['token_address']: self._tracking_window(token) for token, _ in fetched})
+            
+            if config.FAILED_TOKEN_CONFIG['dev_dump']['enabled']:
+                with self.metrics.stage("dev_activity"):
+                    self.dev_activity.prefetch({
+                        token['token_address']: (token.get('creator'), *self._tracking_window(token))
+                        for token, _ in fetched
+                    })
+            
+            for token, trades in fetched:
+                with self._token_span(profiler, token), self.metrics.stage("enrich"), phase("enrich"):
+                    enriched = self._enrich_token_data(token, trades)
+                
                 if enriched:
                     enriched_tokens.append(enriched)
+                    self._annotate_archive(enriched)
+                    if token_callback:
+                        self._emit_token(enriched, token_callback)
         
         print(f"\n✅ Successfully enriched {len(enriched_tokens)} tokens")
         
+        # Step 4: Holder snapshots for successful tokens (batched, concurrent)
+        if config.HOLDERS_CONFIG['enabled'] and enriched_tokens:
+            with self.metrics.stage("holders"):
+                self._attach_holder_snapshots(enriched_tokens)
+        
+        self._record_window(ranges, enriched_tokens)
+        
+        enriched_tokens = sorted(reused + enriched_tokens, key=lambda t: t['launch_time'])
+        self.enriched_tokens = enriched_tokens
+        
         if not enriched_tokens:
             print("⚠️ No tokens could be enriched with price data")
-            return [], [], self._generate_empty_summary(start_datetime, end_datetime)
+            return [], [], self._add_budget(self._generate_empty_summary(start_datetime, end_datetime))
+        
+        # Step 5 + 6: Categorize and summarize
+        successful, failed, summary = self.finalize(enriched_tokens, start_datetime, end_datetime)
+        if self.registry:
+            summary['window_reuse'] = {
+                "reused_tokens": len(reused),
+                "fetched_ranges": [
+                    f"{a.strftime(config.DATETIME_FORMAT)} to {b.strftime(config.DATETIME_FORMAT)}"
+                    for a, b in ranges
+                ]
+            }
+        return successful, failed, self._add_budget(summary)
+    
+    def finalize(self, enriched_tokens, start_datetime, end_datetime):
+        """
+        Categorize already-enriched tokens and build the summary
+        Also used to merge enriched tokens produced by several workers
+        """
+        self.enriched_tokens = enriched_tokens
+        self.window = (start_datetime, end_datetime)
         
-        # Step 3: Categorize
-        successful, failed = self._categorize_tokens(enriched_tokens)
+        if not enriched_tokens:
+            return [], [], self._generate_empty_summary(start_datetime, end_datetime)
         
-        # Step 4: Generate summary statistics
-        summary = self._generate_summary(start_datetime, end_datetime, enriched_tokens, successful, failed)
+        # Step 4: Categorize
+        with self.metrics.stage("categorize"):
+            successful, failed = self._categorize_tokens(enriched_tokens)
+            
+            # Step 5: Generate summary statistics
+            summary = self._generate_summary(start_datetime, end_datetime, enriched_tokens, successful, failed)
         
         print(f"\n📊 Categorization complete:")
         print(f"   ✅ Successful: {len(successful)}")
@@ -76,6 +238,127 @@ class TokenProcessor:
         
         return successful, failed, summary
     
+    def _reusable(self, start_datetime, end_datetime):
+        """(enriched tokens from earlier runs, launch ranges still to discover)"""
+        if not self.registry:
+            return [], [(start_datetime, end_datetime)]
+        return (
+            self.registry.enriched_in(start_datetime, end_datetime),
+            self.registry.uncovered(start_datetime, end_datetime)
+        )
+    
+    def _new_launches(self, tokens, reused):
+        """Launches in order, without duplicates or already enriched mints"""
+        seen = {token['token_address'] for token in reused}
+        new = []
+        for token in sorted(tokens, key=lambda t: t['launch_time'] or ''):
+            if token['token_address'] not in seen:
+                seen.add(token['token_address'])
+                new.append(token)
+        return new
+    
+    def _incomplete(self, reason):
+        if reason not in self.incomplete:
+            self.incomplete.append(reason)
+    
+    def _record_window(self, ranges, enriched_tokens):
+        """
+        Register the covered ranges and enriched tokens of a finished run
+        Failed requests (given up on after retries) may have hidden launches
+        or degraded side lookups: record nothing so the next run looks again
+        """
+        by_query = self.metrics.snapshot()['requests']
+        if any(by_query.get(query_type, {}).get('failed') for query_type in DEGRADING_QUERIES):
+            self._incomplete("failed_requests")
+        
+        if self.registry:
+            if 'failed_requests' in self.incomplete:
+                self.registry.record([], [])
+            else:
+                self.registry.record([] if self.incomplete else ranges, enriched_tokens)
+    
+    def _add_budget(self, summary):
+        """API points spent by the run and the query plan behind them"""
+        summary['api_points'] = self.budget.snapshot()
+        if self.planner.last_plan:
+            summary['query_plan'] = self.planner.last_plan
+        if self.incomplete:
+            summary['incomplete'] = self.incomplete
+        return summary
+    
+    def _token_span(self, profiler, token):
+        """Profiler span for a token, or a no-op when not profiling"""
+        return profiler.token(token['token_address']) if profiler else nullcontext()
+    
+    def _tracking_window(self, token):
+        """Launch time to launch + tracking_duration_hours"""
+        launch_dt = datetime.fromisoformat(token['launch_time'].replace('Z', '+00:00'))
+        track_end_dt = launch_dt + timedelta(hours=config.ANALYSIS_WINDOW['tracking_duration_hours'])
+        return launch_dt, track_end_dt
+    
+    def _prefetch_batched(self, tokens):
+        """Cache the trades of quiet tokens with multi-mint queries"""
+        batch_size = config.BUDGET_CONFIG['batch_size']
+        for i in range(0, len(tokens), batch_size):
+            with self.metrics.stage("fetch"), phase("fetch"):
+                self.bitquery.prefetch_price_history({
+                    token['token_address']: self._tracking_window(token)
+                    for token in tokens[i:i + batch_size]
+                })
+    
+    def _fetch_token(self, token, strategy='raw'):
+        """Fetch one token's trades over its tracking window"""
+        launch_dt, track_end_dt = self._tracking_window(token)
+        
+        # Get price history for this token's tracking window
+        # ('batched' tokens are usually cached by _prefetch_batched by now)
+        with self.metrics.stage("fetch"), phase("fetch"):
+            # Final trades of an earlier run, as zero-copy column views
+            if strategy == 'archive':
+                trades = self.archive.columns(token['token_address'], launch_dt, track_end_dt)
+                if trades is not None and len(trades):
+                    self._keep_trade_series(token, trades)
+                    return trades
+            
+            if strategy == 'candles':
+                trades = self.bitquery.get_token_price_candles(token['token_address'], launch_dt, track_end_dt)
+            elif strategy == 'cache':
+                trades = self.bitquery.cached_price_history(token['token_address'], launch_dt, track_end_dt) or \
+                    self.bitquery.get_token_price_history(token['token_address'], launch_dt, track_end_dt)
+            else:
+                trades = self.bitquery.get_token_price_history(
+                    token['token_address'],
+                    launch_dt,
+                    track_end_dt
+                )
+        
+        if not trades:
+            self.metrics.record_drop("no_trades")
+            return None
+        
+        # Final trades already archived for this window (e.g. served from the cache) are not rewritten
+        if self.archive is not None and not self.archive.has(token['token_address'], launch_dt, track_end_dt):
+            with self.metrics.stage("archive"):
+                self.archive.append(token['token_address'], launch_dt, track_end_dt, trades, price_source(trades))
+        
+        self._keep_trade_series(token, trades)
+        return trades
+    
+    def _keep_trade_series(self, token, trades):
+        """Trades (rows or archived columns) for the Parquet trade export"""
+        if config.EXPORT_CONFIG['parquet'] and config.EXPORT_CONFIG['include_trades']:
+            self.trade_series[token['token_address']] = trades
+    
+    def _annotate_archive(self, enriched):
+        """Supply and marker times next to the archived trades (drill-down chart)"""
+        if self.archive is not None:
+            self.archive.annotate(enriched['token_address'], {
+                'supply': enriched['supply'],
+                'entry_end_time': enriched['entry_end_time'],
+                'peak_time': enriched['peak_time'],
+                'holder_snapshot_time': enriched['holder_snapshot_time'],
+            })
+    
     def _enrich_token_data(self, token, trades):
         """Calculate all metrics from trade data"""
         if not trades:
@@ -83,33 +366,45 @@ class TokenProcessor:
         
         try:
             supply = self.bitquery.get_token_supply(token['token_address'])
+            launch_dt = self._tracking_window(token)[0]
             
-            prices = [float(trade['Trade']['PriceInUSD']) for trade in trades if trade['Trade'].get('PriceInUSD')]
+            # Every trade metric (prices, entry_end, extended features) in one pass
+            features = self.features.compute(trades, launch_dt, supply)
             
-            if not prices:
+            if features['launch_price'] is None:
+                self.metrics.record_drop("no_prices")
                 return None
             
             # Basic metrics
-            launch_price = prices[0]
-            peak_price = max(prices)
-            final_price = prices[-1]
-            
-            launch_mc = self.bitquery.calculate_mc_from_price_and_supply(launch_price, supply)
-            peak_mc = self.bitquery.calculate_mc_from_price_and_supply(peak_price, supply)
-            final_mc = self.bitquery.calculate_mc_from_price_and_supply(final_price, supply)
+            launch_mc = self.bitquery.calculate_mc_from_price_and_supply(features['launch_price'], supply)
+            peak_mc = self.bitquery.calculate_mc_from_price_and_supply(features['peak_price'], supply)
+            final_mc = self.bitquery.calculate_mc_from_price_and_supply(features['final_price'], supply)
+            entry_end_mc = features['entry_end_mc']
             
-            # Find peak time
-            peak_trade = max(trades, key=lambda t: float(t['Trade'].get('PriceInUSD', 0)))
-            peak_time = peak_trade['Block']['Time']
+            # Calculate liquidity from pool reserves at window end,
+            # falling back to trade sizes when reserves are unavailable
+            # (candle-sourced tokens have no real trade sizes to fall back on)
+            liquidity = self.liquidity.get(token['token_address'], self._tracking_window(token)[1])
+            if liquidity:
+                avg_liquidity = liquidity['avg_liquidity']
+                final_liquidity = liquidity['final_liquidity']
+                liquidity_series = liquidity['series']
+                liquidity_source = 'pool_reserves'
+            else:
+                avg_liquidity = features['trade_avg_liquidity']
+                final_liquidity = features['trade_final_liquidity']
+                liquidity_series = []
+                if final_liquidity is None:
+                    liquidity_source = 'unavailable'
+                elif token['token_address'] in self.liquidity.failed:
+                    liquidity_source = 'last_trade_query_failed'
+                else:
+                    liquidity_source = 'last_trade'
             
-            # Calculate entry_end (when MC hits $25K or fallback)
-            entry_end_time, entry_end_mc = self._calculate_entry_end(token, trades, supply)
-            
-            # Calculate liquidity
-            liquidities = [float(trade['Trade']['Side']['AmountInUSD']) for trade in trades 
-                          if trade['Trade']['Side'].get('AmountInUSD')]
-            avg_liquidity = sum(liquidities) / len(liquidities) if liquidities else 0
-            final_liquidity = liquidities[-1] if liquidities else 0
+            # Share of the creator's tokens sold (dev_dump rule)
+            dev_sold_percentage = self.dev_activity.dev_sold_percentage(
+                token['token_address'], self._tracking_window(token)[1]
+            )
             
             # Tank percentage
             tank_percentage = ((peak_mc - final_mc) / peak_mc * 100) if peak_mc > 0 else 0
@@ -117,55 +412,59 @@ class TokenProcessor:
             # ROI from entry_end
             roi_from_entry_end = (peak_mc / entry_end_mc) if entry_end_mc > 0 else 0
             
-            return {
+            enriched = {
                 **token,
+                **features,
                 'supply': supply,
-                'launch_price': launch_price,
                 'launch_mc': launch_mc,
-                'peak_time': peak_time,
-                'peak_price': peak_price,
                 'peak_mc': peak_mc,
-                'final_price': final_price,
                 'final_mc': final_mc,
-                'entry_end_time': entry_end_time,
-                'entry_end_mc': entry_end_mc,
                 'tank_percentage': tank_percentage,
                 'roi_from_entry_end': roi_from_entry_end,
                 'avg_liquidity': avg_liquidity,
-                'final_liquidity': final_liquidity
+                'final_liquidity': final_liquidity,
+                'liquidity_source': liquidity_source,
+                'liquidity_series': liquidity_series,
+                'dev_sold_percentage': dev_sold_percentage
             }
             
+            # Chart marker for the holder snapshot (peak_time - 10 minutes)
+            enriched['holder_snapshot_time'] = self._holder_snapshot_dt(enriched).strftime(config.DATETIME_FORMAT)
+            
+            return enriched
+            
         except Exception as e:
             print(f"❌ Error enriching {token['token_address'][:8]}: {e}")
+            self.metrics.record_drop("enrich_error")
             return None
     
-    def _calculate_entry_end(self, token, trades, supply):
-        """
-        Calculate entry_end time and MC
-        Logic: When MC hits $25K, or launch + 5 mins if already above $25K
-        """
-        threshold = config.SUCCESSFUL_TOKEN_CONFIG['entry_end_mc_threshold']
-        fallback_mins = config.SUCCESSFUL_TOKEN_CONFIG['entry_end_fallback_minutes']
-        
-        launch_dt = datetime.fromisoformat(token['launch_time'].replace('Z', '+00:00'))
-        
-        # Check each trade to find when MC hit $25K
-        for trade in trades:
-            price = float(trade['Trade'].get('PriceInUSD', 0))
-            mc = self.bitquery.calculate_mc_from_price_and_supply(price, supply)
-            trade_time = trade['Block']['Time']
-            
-            if mc >= threshold:
-                return trade_time, mc
-        
-        # Fallback: launch + 5 minutes
-        fallback_time = (launch_dt + timedelta(minutes=fallback_mins)).strftime(config.DATETIME_FORMAT)
-        
-        # Use launch_mc as fallback
-        launch_price = float(trades[0]['Trade']['PriceInUSD'])
-        fallback_mc = self.bitquery.calculate_mc_from_price_and_supply(launch_price, supply)
+    def _holder_snapshot_dt(self, token):
+        """peak_time minus holder_snapshot_before_peak_minutes"""
+        peak_dt = datetime.fromisoformat(token['peak_time'].replace('Z', '+00:00'))
+        return peak_dt - timedelta(minutes=config.SUCCESSFUL_TOKEN_CONFIG['holder_snapshot_before_peak_minutes'])
+    
+    def _attach_holder_snapshots(self, enriched_tokens):
+        """Add a 'holders' snapshot to every successful token"""
+        winners = [t for t in enriched_tokens if self._is_successful(t)]
+        if not winners:
+            return
+        
+        snapshots = self.holders.snapshot(
+            {t['token_address']: self._holder_snapshot_dt(t) for t in winners},
+            {t['token_address']: t['supply'] for t in winners}
+        )
+        for token in winners:
+            if token['token_address'] in snapshots:
+                token['holders'] = snapshots[token['token_address']]
         
-        return fallback_time, fallback_mc
+        print(f"👥 Holder snapshots for {len(snapshots)}/{len(winners)} successful tokens")
+    
+    def _emit_token(self, token, token_callback):
+        """Classify one enriched token and hand it to the callback"""
+        if self._is_successful(token):
+            token_callback('successful', self._format_successful_token(token))
+        elif self._is_failed(token):
+            token_callback('failed', self._format_failed_token(token))
     
     def _categorize_tokens(self, enriched_tokens):
         """Apply success/failure criteria"""
@@ -177,8 +476,14 @@ class TokenProcessor:
                 successful.append(self._format_successful_token(token))
             elif self._is_failed(token):
                 failed.append(self._format_failed_token(token))
+            else:
+                self.metrics.record_drop("uncategorized")
         
         # Limit to configured maxes
+        if len(successful) > config.MAX_SUCCESSFUL_TOKENS:
+            self.metrics.record_drop("over_successful_limit", len(successful) - config.MAX_SUCCESSFUL_TOKENS)
+        if len(failed) > config.MAX_FAILED_TOKENS:
+            self.metrics.record_drop("over_failed_limit", len(failed) - config.MAX_FAILED_TOKENS)
         successful = successful[:config.MAX_SUCCESSFUL_TOKENS]
         failed = failed[:config.MAX_FAILED_TOKENS]
         
@@ -209,10 +514,14 @@ class TokenProcessor:
         is_rug = (
             cfg['rug_pull']['enabled'] and
             token['peak_mc'] >= cfg['rug_pull']['min_initial_mc'] and
+            token['final_liquidity'] is not None and
             token['final_liquidity'] <= cfg['rug_pull']['max_final_liquidity']
         )
         
-        return is_pump_dump or is_rug
+        # Type 3: Dev Dump
+        is_dev_dump = self._is_dev_dump(token)
+        
+        return is_pump_dump or is_rug or is_dev_dump
     
     def _format_successful_token(self, token):
         """Format to EXACT JSON structure specified"""
@@ -220,11 +529,9 @@ class TokenProcessor:
         entry_end = token['entry_end_time']
         
         # Calculate holder_snapshot (peak_time - 10 minutes)
-        peak_dt = datetime.fromisoformat(token['peak_time'].replace('Z', '+00:00'))
-        snapshot_dt = peak_dt - timedelta(minutes=config.SUCCESSFUL_TOKEN_CONFIG['holder_snapshot_before_peak_minutes'])
-        holder_snapshot = snapshot_dt.strftime(config.DATETIME_FORMAT)
+        holder_snapshot = self._holder_snapshot_dt(token).strftime(config.DATETIME_FORMAT)
         
-        return {
+        formatted = {
             "token_address": token['token_address'],
             "launch_time": entry_start,
             "launch_mc": int(token['launch_mc']),
@@ -235,17 +542,33 @@ class TokenProcessor:
             "entry_end": entry_end,
             "holder_snapshot": holder_snapshot
         }
+        
+        # Prices from OHLC candles: trader/side/size features are unavailable
+        if token.get('price_source') == 'candles':
+            formatted["price_source"] = 'candles'
+        
+        # Holders at holder_snapshot time (when the snapshot engine ran)
+        if 'holders' in token:
+            formatted["holder_count"] = token['holders']['holder_count']
+            # True when the snapshot hit max_holders: the count is a lower bound
+            formatted["holder_count_capped"] = token['holders']['holder_count_capped']
+            formatted["top_holders"] = token['holders']['top_holders']
+        
+        return formatted
     
     def _format_failed_token(self, token):
         """Format failed tokens (simplified)"""
         launch_dt = datetime.fromisoformat(token['launch_time'].replace('Z', '+00:00'))
         entry_end_dt = launch_dt + timedelta(minutes=config.FAILED_TOKEN_CONFIG['entry_window_minutes'])
         
-        return {
+        formatted = {
             "token_address": token['token_address'],
             "entry_start": token['launch_time'],
             "entry_end": entry_end_dt.strftime(config.DATETIME_FORMAT)
         }
+        if token.get('price_source') == 'candles':
+            formatted["price_source"] = 'candles'
+        return formatted
     
     def _generate_empty_summary(self, start_dt, end_dt):
         """Generate summary when no tokens found"""
@@ -265,7 +588,8 @@ class TokenProcessor:
                 "total": 0,
                 "breakdown": {
                     "pump_and_dump": 0,
-                    "rug_pull": 0
+                    "rug_pull": 0,
+                    "dev_dump": 0
                 }
             },
             "warning": "No tokens were found or successfully enriched. Try a different date or time range."
@@ -284,6 +608,7 @@ class TokenProcessor:
         # Failure type breakdown
         pump_dump_count = sum(1 for t in enriched if self._is_pump_dump(t))
         rug_pull_count = sum(1 for t in enriched if self._is_rug_pull(t))
+        dev_dump_count = sum(1 for t in enriched if self._is_dev_dump(t))
         
         return {
             "date": start_dt.strftime(config.DATE_FORMAT),
@@ -301,11 +626,38 @@ class TokenProcessor:
                 "total": len(failed),
                 "breakdown": {
                     "pump_and_dump": pump_dump_count,
-                    "rug_pull": rug_pull_count
+                    "rug_pull": rug_pull_count,
+                    "dev_dump": dev_dump_count
                 }
+            },
+            # Candle-sourced tokens have no trader/side/size features
+            "price_sources": {
+                source: sum(1 for t in enriched if t.get('price_source', 'trades') == source)
+                for source in ('trades', 'candles')
             }
         }
     
+    def _category(self, token):
+        """Single category label for a token (used by the token store)"""
+        if self._is_successful(token):
+            return 'successful'
+        if self._is_pump_dump(token):
+            return 'pump_and_dump'
+        if self._is_rug_pull(token):
+            return 'rug_pull'
+        if self._is_dev_dump(token):
+            return 'dev_dump'
+        return 'uncategorized'
+    
+    def _failure_flags(self, token):
+        """Every failure pattern a token matches (same counts as the summary breakdown)"""
+        checks = {
+            'pump_and_dump': self._is_pump_dump,
+            'rug_pull': self._is_rug_pull,
+            'dev_dump': self._is_dev_dump,
+        }
+        return [name for name, check in checks.items() if check(token)]
+    
     def _is_pump_dump(self, token):
         """Check if token is pump & dump"""
         cfg = config.FAILED_TOKEN_CONFIG['pump_and_dump']
@@ -322,11 +674,23 @@ class TokenProcessor:
         return (
             cfg['enabled'] and
             token['peak_mc'] >= cfg['min_initial_mc'] and
+            token['final_liquidity'] is not None and
             token['final_liquidity'] <= cfg['max_final_liquidity']
         )
     
+    def _is_dev_dump(self, token):
+        """Check if the creator dumped their tokens"""
+        cfg = config.FAILED_TOKEN_CONFIG['dev_dump']
+        return (
+            cfg['enabled'] and
+            token.get('dev_sold_percentage') is not None and
+            token['peak_mc'] >= cfg['min_initial_mc'] and
+            token['dev_sold_percentage'] >= cfg['dev_sold_percentage']
+        )
+    
     def save_to_json_files(self, successful_tokens, failed_tokens, summary, date_label):
         """Save to separate JSON files"""
+        save_started = time.perf_counter()
         os.makedirs(config.OUTPUT_DIR, exist_ok=True)
         date_dir = os.path.join(config.OUTPUT_DIR, date_label)
         os.makedirs(date_dir, exist_ok=True)
@@ -351,4 +715,54 @@ class TokenProcessor:
         print(f"   ✅ {successful_file}")
         print(f"   ❌ {failed_file}")
         
+        # Index this run's enriched tokens for cross-date queries
+        if config.STORE_CONFIG['enabled'] and self.enriched_tokens:
+            stored = TokenStore().ingest(
+                date_label,
+                [{**t, 'category': self._category(t)} for t in self.enriched_tokens]
+            )
+            print(f"   🗄️ {stored} tokens indexed in {config.STORE_CONFIG['db_path']}")
+        
+        # Fold the run into the hourly / daily trend counters
+        if config.ROLLUP_CONFIG['enabled'] and self.enriched_tokens:
+            rolled = RollupStore().ingest([
+                {**t, 'category': self._category(t), 'failure_flags': self._failure_flags(t)}
+                for t in self.enriched_tokens
+            ])
+            print(f"   📈 {rolled} tokens rolled up in {config.ROLLUP_CONFIG['db_path']}")
+        
+        # Columnar export for research
+        if config.EXPORT_CONFIG['parquet']:
+            self.save_to_parquet_files(date_label)
+        
+        # Export run metrics (JSON sink appends them to the summary file)
+        self.metrics.add_stage_time("save", time.perf_counter() - save_started)
+        for sink in metrics_module.build_sinks():
+            sink.export(self.metrics, summary_file)
+        
         return summary_file, successful_file, failed_file
+    
+    def save_to_parquet_files(self, date_label):
+        """Export the last run's enriched tokens (and trade series) as date-partitioned Parquet"""
+        if not export.parquet_available():
+            print("⚠️ Parquet export skipped: pyarrow is not installed")
+            return []
+        
+        if not self.enriched_tokens:
+            return []
+        
+        start_dt, end_dt = self.window
+        part_name = f"part-{start_dt.strftime('%H%M')}-{end_dt.strftime('%H%M')}"
+        
+        paths = [export.export_tokens(
+            [{**t, 'category': self._category(t)} for t in self.enriched_tokens],
+            date_label,
+            part_name
+        )]
+        if self.trade_series:
+            paths.append(export.export_trades(self.trade_series, date_label, part_name))
+        
+        for path in paths:
+            print(f"   🧱 {path}")
+        
+        return paths
@@ -0,0 +1,162 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Profiler - Opt-in sampled CPU profile and per-token wall-clock spans
+Writes flamegraph-compatible folded stacks next to the JSON outputs
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import config
+
+# Human readable reason for each phase when it dominates a token's time
+PHASE_REASONS = {
+    'network': 'network wait',
+    'json_decode': 'JSON decoding',
+    'enrich': 'enrichment',
+    'fetch': 'fetch overhead',
+    'other': 'other processing',
+}
+
+_active = threading.local()
+
+
+@contextmanager
+def phase(name):
+    """
+    Attribute the enclosed wall time to a phase of the active token span
+    Nested phases are exclusive: time spent in a child is not counted twice
+    No-op when no token span is active on this thread
+    """
+    span = getattr(_active, 'span', None)
+    if span is None:
+        yield
+        return
+
+    frame = [name, time.perf_counter(), 0.0]
+    span.stack.append(frame)
+    try:
+        yield
+    finally:
+        span.stack.pop()
+        elapsed = time.perf_counter() - frame[1]
+        span.phases[name] = span.phases.get(name, 0.0) + elapsed - frame[2]
+        if span.stack:
+            span.stack[-1][2] += elapsed
+
+
+class TokenSpan:
+    """Wall-clock timing of one token, split by phase"""
+
+    def __init__(self, token_address):
+        self.token_address = token_address
+        self.phases = {}
+        self.stack = []
+        self.total = 0.0
+
+    def phase_totals(self):
+        """Seconds per phase, with unattributed time under 'other'"""
+        phases = dict(self.phases)
+        accounted = sum(phases.values())
+        if self.total > accounted:
+            phases['other'] = self.total - accounted
+        return phases
+
+    def to_dict(self):
+        phases = self.phase_totals()
+        slowest_phase = max(phases, key=phases.get) if phases else 'other'
+        return {
+            "token_address": self.token_address,
+            "total_seconds": round(self.total, 4),
+            "phases": {k: round(v, 4) for k, v in phases.items()},
+            "reason": PHASE_REASONS.get(slowest_phase, slowest_phase)
+        }
+
+
+class Profiler:
+    """Samples the calling thread's stack and records token spans"""
+
+    def __init__(self, interval_ms=None):
+        interval_ms = interval_ms or config.PROFILING_CONFIG['sample_interval_ms']
+        self.interval = interval_ms / 1000.0
+        self.samples = {}           # folded stack -> sample count
+        self.spans = {}             # token address -> TokenSpan
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+
+            folded = ";".join(reversed(stack))
+            self.samples[folded] = self.samples.get(folded, 0) + 1
+
+    @contextmanager
+    def token(self, token_address):
+        """
+        Open a wall-clock span for one token on this thread
+        Re-entering the same token (fetch, then enrich) adds to its span
+        """
+        span = self.spans.get(token_address)
+        if span is None:
+            span = self.spans[token_address] = TokenSpan(token_address)
+        previous = getattr(_active, 'span', None)
+        _active.span = span
+        started = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.total += time.perf_counter() - started
+            _active.span = previous
+
+    def slowest_tokens(self, limit=None):
+        limit = limit or config.PROFILING_CONFIG['slowest_tokens']
+        spans = sorted(self.spans.values(), key=lambda s: s.total, reverse=True)
+        return [s.to_dict() for s in spans[:limit]]
+
+    def write_files(self, date_label):
+        """
+        Write CPU samples and token spans as folded stacks
+        (input format of flamegraph.pl / speedscope)
+        """
+        date_dir = os.path.join(config.OUTPUT_DIR, date_label)
+        os.makedirs(date_dir, exist_ok=True)
+
+        cpu_file = os.path.join(date_dir, f"profile_cpu_{date_label}.folded")
+        with open(cpu_file, 'w') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+        # Wall-clock spans in microseconds: token;<address>;<phase>
+        spans_file = os.path.join(date_dir, f"profile_spans_{date_label}.folded")
+        with open(spans_file, 'w') as f:
+            for span in self.spans.values():
+                for phase_name, seconds in span.phase_totals().items():
+                    micros = int(seconds * 1_000_000)
+                    if micros > 0:
+                        f.write(f"tokens;{span.token_address};{phase_name} {micros}\n")
+
+        return cpu_file, spans_file
@@ -0,0 +1,150 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Window Registry - Reuse launches and enriched tokens across overlapping runs
+Records which launch ranges were fully processed and every enriched token,
+keyed by tracking_duration_hours and config hash. A new window then only
+discovers the uncovered launch ranges and enriches mints not seen before.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+import config
+from db import connect, create
+from cache import config_hash
+from store import parse_time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS coverage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    tracking_hours REAL NOT NULL,
+    config_hash TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_coverage_range ON coverage (config_hash, tracking_hours, start_ts);
+
+CREATE TABLE IF NOT EXISTS enriched (
+    token_address TEXT NOT NULL,
+    tracking_hours REAL NOT NULL,
+    config_hash TEXT NOT NULL,
+    date TEXT NOT NULL,
+    launch_ts REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (token_address, tracking_hours, config_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_enriched_launch ON enriched (config_hash, tracking_hours, launch_ts);
+"""
+
+
+class WindowRegistry:
+    """Covered launch ranges and enriched tokens per (tracking hours, config hash)"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.REGISTRY_CONFIG['db_path']
+        self._lock = threading.Lock()
+        create(self.db_path, SCHEMA)
+
+    def _key(self):
+        """Results are only reusable under the same tracking window and config"""
+        return config.ANALYSIS_WINDOW['tracking_duration_hours'], config_hash()
+
+    def uncovered(self, start_datetime, end_datetime):
+        """Launch sub-ranges of [start, end] not fully processed by an earlier run"""
+        start_ts = parse_time(start_datetime).timestamp()
+        end_ts = parse_time(end_datetime).timestamp()
+        tracking_hours, digest = self._key()
+
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT start_ts, end_ts FROM coverage "
+                "WHERE config_hash = ? AND tracking_hours = ? AND start_ts <= ? AND end_ts >= ? "
+                "ORDER BY start_ts",
+                (digest, tracking_hours, end_ts, start_ts)
+            ).fetchall()
+
+        gaps = []
+        cursor = start_ts
+        for row in rows:
+            if row['start_ts'] > cursor:
+                gaps.append((cursor, row['start_ts']))
+            cursor = max(cursor, row['end_ts'])
+            if cursor >= end_ts:
+                break
+        if cursor < end_ts:
+            gaps.append((cursor, end_ts))
+
+        # Same flavour (naive UTC or aware) as the caller's datetimes
+        naive = start_datetime.tzinfo is None
+
+        def to_datetime(ts):
+            dt = datetime.fromtimestamp(ts, timezone.utc)
+            return dt.replace(tzinfo=None) if naive else dt
+
+        return [(to_datetime(a), to_datetime(b)) for a, b in gaps]
+
+    def enriched_in(self, start_datetime, end_datetime):
+        """Enriched tokens launched in [start, end] under the current key"""
+        tracking_hours, digest = self._key()
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT data FROM enriched "
+                "WHERE config_hash = ? AND tracking_hours = ? AND launch_ts BETWEEN ? AND ? "
+                "ORDER BY launch_ts",
+                (
+                    digest,
+                    tracking_hours,
+                    parse_time(start_datetime).timestamp(),
+                    parse_time(end_datetime).timestamp()
+                )
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def record(self, ranges, enriched_tokens):
+        """
+        Save newly enriched tokens and the launch ranges they complete
+        ranges: [(start, end)] fully processed; pass [] (and no tokens) when a
+        run was cut short or had failed requests so it is re-discovered
+        Only launches whose tracking window is over are final: later
+        launches and the part of each range after them are left uncovered
+        """
+        tracking_hours, digest = self._key()
+        final_before = time.time() - tracking_hours * 3600
+
+        token_rows = []
+        for token in enriched_tokens:
+            launch_dt = parse_time(token['launch_time'])
+            if launch_dt.timestamp() >= final_before:
+                continue
+            token_rows.append((
+                token['token_address'],
+                tracking_hours,
+                digest,
+                launch_dt.strftime(config.DATE_FORMAT),
+                launch_dt.timestamp(),
+                json.dumps(token, default=str),
+            ))
+
+        coverage_rows = [
+            (
+                parse_time(start).strftime(config.DATE_FORMAT),
+                parse_time(start).timestamp(),
+                min(parse_time(end).timestamp(), final_before),
+                tracking_hours,
+                digest,
+                time.time(),
+            )
+            for start, end in ranges
+            if parse_time(start).timestamp() < final_before
+        ]
+
+        with self._lock, connect(self.db_path) as conn:
+            conn.executemany("INSERT OR REPLACE INTO enriched VALUES (?, ?, ?, ?, ?, ?)", token_rows)
+            conn.executemany(
+                "INSERT INTO coverage (date, start_ts, end_ts, tracking_hours, config_hash, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                coverage_rows
+            )
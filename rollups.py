@@ -0,0 +1,180 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Rollups - Pre-aggregated per-hour and per-day counters of every saved run
+Each save adds its enriched tokens' contributions (categories, failure
+flags, ROI and peak MC buckets) to hourly and daily counters; launches
+dropped before enrichment are not counted. A token's last contribution
+is remembered, so re-running a window swaps it out instead of counting
+it twice. Trend views read a few hundred counter rows
+instead of re-aggregating every day's JSON.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+import config
+from db import connect, create
+from store import parse_time
+
+PERIODS = {'hour': 3600, 'day': 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    period TEXT NOT NULL,
+    bucket_ts INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (period, bucket_ts, metric)
+);
+
+CREATE TABLE IF NOT EXISTS contributions (
+    token_address TEXT PRIMARY KEY,
+    hour_ts INTEGER NOT NULL,
+    metrics TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def _money(value):
+    """10000 -> '$10K'"""
+    for divisor, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if value >= divisor:
+            return f"${value / divisor:g}{suffix}"
+    return f"${value:g}"
+
+
+def bucket_label(value, edges, fmt):
+    """Histogram bucket of value for ascending edges, e.g. '10x-50x' or '80x+'"""
+    value = value or 0
+    if value < edges[0]:
+        return f"<{fmt(edges[0])}"
+    for low, high in zip(edges, edges[1:]):
+        if value < high:
+            return f"{fmt(low)}-{fmt(high)}"
+    return f"{fmt(edges[-1])}+"
+
+
+def bucket_labels(edges, fmt):
+    """Every bucket label of edges, lowest first (chart ordering)"""
+    return (
+        [f"<{fmt(edges[0])}"] +
+        [f"{fmt(low)}-{fmt(high)}" for low, high in zip(edges, edges[1:])] +
+        [f"{fmt(edges[-1])}+"]
+    )
+
+
+def roi_labels():
+    return bucket_labels(config.ROLLUP_CONFIG['roi_buckets'], lambda v: f"{v:g}x")
+
+
+def peak_mc_labels():
+    return bucket_labels(config.ROLLUP_CONFIG['peak_mc_buckets'], _money)
+
+
+def token_metrics(token):
+    """
+    Counter names a token adds to its hour and day
+    token: enriched token with 'category' and 'failure_flags'
+    """
+    cfg = config.ROLLUP_CONFIG
+    metrics = ['enriched', f"category:{token['category']}"]
+    metrics += [f"flag:{flag}" for flag in token.get('failure_flags', [])]
+    metrics.append("roi:" + bucket_label(token.get('roi_from_entry_end'), cfg['roi_buckets'], lambda v: f"{v:g}x"))
+    metrics.append("peak_mc:" + bucket_label(token.get('peak_mc'), cfg['peak_mc_buckets'], _money))
+    return metrics
+
+
+class RollupStore:
+    """Hourly and daily counters, updated incrementally on every save"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.ROLLUP_CONFIG['db_path']
+        self._lock = threading.Lock()
+        create(self.db_path, SCHEMA)
+
+    def ingest(self, tokens):
+        """
+        Fold a run's tokens into the counters
+        Tokens counted by an earlier save are first taken back out
+        """
+        contributions = {}
+        for token in tokens:
+            hour_ts = int(parse_time(token['launch_time']).timestamp()) // 3600 * 3600
+            contributions[token['token_address']] = (hour_ts, token_metrics(token))
+
+        with self._lock, connect(self.db_path) as conn:
+            deltas = Counter()
+            addresses = list(contributions)
+            for i in range(0, len(addresses), 500):
+                chunk = addresses[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT * FROM contributions WHERE token_address IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for row in rows:
+                    self._count(deltas, row['hour_ts'], json.loads(row['metrics']), -1)
+
+            for hour_ts, metrics in contributions.values():
+                self._count(deltas, hour_ts, metrics, 1)
+
+            conn.executemany(
+                "INSERT INTO counters (period, bucket_ts, metric, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(period, bucket_ts, metric) DO UPDATE SET value = value + excluded.value",
+                [(period, bucket_ts, metric, delta) for (period, bucket_ts, metric), delta in deltas.items() if delta]
+            )
+            conn.execute("DELETE FROM counters WHERE value = 0")
+            conn.executemany(
+                "INSERT OR REPLACE INTO contributions VALUES (?, ?, ?)",
+                [(address, hour_ts, json.dumps(metrics)) for address, (hour_ts, metrics) in contributions.items()]
+            )
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('updated_at', ?)", (time.time(),))
+        return len(contributions)
+
+    def _count(self, deltas, hour_ts, metrics, sign):
+        for period, seconds in PERIODS.items():
+            bucket_ts = hour_ts // seconds * seconds
+            for metric in metrics:
+                deltas[(period, bucket_ts, metric)] += sign
+
+    def version(self):
+        """Time of the last ingest (cache key for the trend views)"""
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'updated_at'").fetchone()
+        return row['value'] if row else 0
+
+    def series(self, period, start, end):
+        """{bucket_ts: {metric: value}} for 'hour' or 'day' buckets in [start, end]"""
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT bucket_ts, metric, value FROM counters "
+                "WHERE period = ? AND bucket_ts BETWEEN ? AND ? ORDER BY bucket_ts",
+                (period, parse_time(start).timestamp(), parse_time(end).timestamp())
+            ).fetchall()
+        series = {}
+        for row in rows:
+            series.setdefault(row['bucket_ts'], {})[row['metric']] = row['value']
+        return series
+
+    def profile(self, by, start, end):
+        """
+        Counters summed by hour of day (0-23) or weekday (0 = Monday)
+        over the hourly buckets in [start, end]
+        """
+        # 1970-01-01 was a Thursday (weekday 3)
+        key = "(bucket_ts / 3600) % 24" if by == 'hour' else "(bucket_ts / 86400 + 3) % 7"
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                f"SELECT {key} AS slot, metric, SUM(value) AS value FROM counters "
+                "WHERE period = 'hour' AND bucket_ts BETWEEN ? AND ? GROUP BY slot, metric",
+                (parse_time(start).timestamp(), parse_time(end).timestamp())
+            ).fetchall()
+        profile = {}
+        for row in rows:
+            profile.setdefault(row['slot'], {})[row['metric']] = row['value']
+        return profile
@@ -0,0 +1,155 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Token Store - Indexed SQLite store of every run's enriched tokens
+Answers cross-date range and top-N queries without re-running the tracker
+"""
+
+import json
+import threading
+from datetime import datetime, timezone
+import config
+from db import connect, create
+
+# Columns callers may sort by (mapped to indexed SQL columns)
+SORT_COLUMNS = {
+    'launch_time': 'launch_ts',
+    'peak_mc': 'peak_mc',
+    'roi': 'roi',
+    'launch_mc': 'launch_mc',
+}
+
+CATEGORIES = ['successful', 'pump_and_dump', 'rug_pull', 'dev_dump', 'uncategorized']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    token_address TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    launch_time TEXT NOT NULL,
+    launch_ts REAL NOT NULL,
+    launch_hour INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    launch_mc REAL,
+    peak_mc REAL,
+    final_mc REAL,
+    roi REAL,
+    tank_percentage REAL,
+    final_liquidity REAL,
+    peak_time TEXT,
+    entry_end_time TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tokens_launch_ts ON tokens (launch_ts);
+CREATE INDEX IF NOT EXISTS idx_tokens_category ON tokens (category, launch_ts);
+CREATE INDEX IF NOT EXISTS idx_tokens_hour ON tokens (launch_hour, launch_ts);
+CREATE INDEX IF NOT EXISTS idx_tokens_peak_mc ON tokens (peak_mc);
+CREATE INDEX IF NOT EXISTS idx_tokens_roi ON tokens (roi);
+"""
+
+
+def parse_time(value):
+    """Bitquery ISO or config.DATETIME_FORMAT string -> aware UTC datetime"""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class TokenStore:
+    """Thread-safe wrapper around the local SQLite database"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.STORE_CONFIG['db_path']
+        self._lock = threading.Lock()
+        create(self.db_path, SCHEMA)
+
+    def ingest(self, date_label, tokens):
+        """
+        Upsert enriched tokens (each with a 'category' key)
+        Re-running a window simply refreshes the stored rows
+        Series fields (lists) are left out to keep rows small
+        """
+        rows = []
+        for token in tokens:
+            launch_dt = parse_time(token['launch_time'])
+            rows.append((
+                token['token_address'],
+                date_label,
+                launch_dt.strftime(config.DATETIME_FORMAT),
+                launch_dt.timestamp(),
+                launch_dt.hour,
+                token['category'],
+                token.get('launch_mc'),
+                token.get('peak_mc'),
+                token.get('final_mc'),
+                token.get('roi_from_entry_end'),
+                token.get('tank_percentage'),
+                token.get('final_liquidity'),
+                token.get('peak_time'),
+                token.get('entry_end_time'),
+                json.dumps({k: v for k, v in token.items() if not isinstance(v, list)}, default=str),
+            ))
+
+        with self._lock, connect(self.db_path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def query(self, start=None, end=None, categories=None, hour_from=None, hour_to=None,
+              min_roi=None, min_peak_mc=None, order_by='launch_time', descending=False, limit=None):
+        """
+        Range query over launch time with optional filters
+        start/end: datetimes (UTC) bounding launch time
+        hour_from/hour_to: launch hour of day, inclusive (wraps past midnight)
+        Returns list of enriched token dicts with their category
+        """
+        clauses, params = [], []
+
+        if start is not None:
+            clauses.append("launch_ts >= ?")
+            params.append(parse_time(start).timestamp())
+        if end is not None:
+            clauses.append("launch_ts <= ?")
+            params.append(parse_time(end).timestamp())
+        if categories:
+            clauses.append(f"category IN ({','.join('?' * len(categories))})")
+            params.extend(categories)
+        if hour_from is not None and hour_to is not None:
+            if hour_from <= hour_to:
+                clauses.append("launch_hour BETWEEN ? AND ?")
+            else:
+                clauses.append("(launch_hour >= ? OR launch_hour <= ?)")
+            params.extend([hour_from, hour_to])
+        if min_roi is not None:
+            clauses.append("roi >= ?")
+            params.append(min_roi)
+        if min_peak_mc is not None:
+            clauses.append("peak_mc >= ?")
+            params.append(min_peak_mc)
+
+        sql = "SELECT category, data FROM tokens"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {SORT_COLUMNS[order_by]} {'DESC' if descending else 'ASC'}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        with connect(self.db_path) as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        return [{**json.loads(row['data']), 'category': row['category']} for row in rows]
+
+    def top(self, n, by='roi', **filters):
+        """Top-N tokens by roi, peak_mc or launch_mc"""
+        return self.query(order_by=by, descending=True, limit=n, **filters)
+
+    def dates(self):
+        """Dates with stored tokens, newest first"""
+        with connect(self.db_path) as conn:
+            rows = conn.execute("SELECT DISTINCT date FROM tokens ORDER BY date DESC").fetchall()
+        return [row['date'] for row in rows]
@@ -0,0 +1,33 @@
+import numpy as np
+
+from charts import lttb
+
+
+def test_short_series_is_returned_unchanged():
+    x = np.arange(10, dtype=float)
+    y = np.sin(x)
+    out_x, out_y = lttb(x, y, 50)
+    assert out_x is x and out_y is y
+
+
+def test_keeps_endpoints_and_size():
+    x = np.arange(10_000, dtype=float)
+    y = np.random.default_rng(0).normal(size=10_000).cumsum()
+    out_x, out_y = lttb(x, y, 300)
+
+    assert len(out_x) == len(out_y) == 300
+    assert out_x[0] == x[0] and out_x[-1] == x[-1]
+    assert np.all(np.diff(out_x) > 0)
+    # Picked points are real points of the series
+    assert np.array_equal(out_y, y[out_x.astype(int)])
+
+
+def test_keeps_spikes():
+    x = np.arange(5_000, dtype=float)
+    y = np.zeros(5_000)
+    y[1234] = 100.0     # A pump
+    y[4000] = -50.0     # A dump
+    out_x, _ = lttb(x, y, 100)
+
+    assert 1234 in out_x
+    assert 4000 in out_x
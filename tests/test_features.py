@@ -0,0 +1,66 @@
+"""Row (update) and column (consume) feature paths must agree exactly"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from archive import TradeArchive
+from features import FEATURES, FeatureEngine
+
+LAUNCH = datetime(2025, 1, 1, 14, 0, 0, tzinfo=timezone.utc)
+SUPPLY = 1_000_000_000
+
+
+def make_trades(seed, count):
+    """Bitquery-shaped trades with gaps, bursts and missing side / owner fields"""
+    rnd = random.Random(seed)
+    trades = []
+    ts = LAUNCH
+    price = 0.00001
+    for _ in range(count):
+        ts += timedelta(seconds=rnd.choice([0, 1, 1, 2, 5, 30, 300]))
+        price = max(1e-8, price * rnd.uniform(0.7, 1.4))
+        trade = {'PriceInUSD': price, 'Currency': {'MintAddress': 'mint'}}
+        if rnd.random() > 0.05:
+            trade['Side'] = {'AmountInUSD': rnd.uniform(0.5, 900), 'Type': rnd.choice(['buy', 'sell'])}
+        if rnd.random() > 0.05:
+            trade['Account'] = {'Owner': f"wallet{rnd.randint(0, 60)}"}
+        trades.append({'Block': {'Time': ts.strftime("%Y-%m-%dT%H:%M:%SZ")}, 'Trade': trade})
+    return trades
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_columns_match_rows(tmp_path, seed):
+    trades = make_trades(seed, 500)
+    archive = TradeArchive(str(tmp_path))
+    archive.append('mint', LAUNCH, LAUNCH + timedelta(hours=2), trades)
+
+    engine = FeatureEngine(list(FEATURES))
+    from_rows = engine.compute(trades, LAUNCH, SUPPLY)
+    from_columns = engine.compute(archive.columns('mint'), LAUNCH, SUPPLY)
+
+    assert from_columns == from_rows
+
+
+def test_single_trade(tmp_path):
+    trades = make_trades(99, 1)
+    archive = TradeArchive(str(tmp_path))
+    archive.append('mint', LAUNCH, LAUNCH + timedelta(hours=2), trades)
+
+    engine = FeatureEngine(list(FEATURES))
+    assert engine.compute(archive.columns('mint'), LAUNCH, SUPPLY) == engine.compute(trades, LAUNCH, SUPPLY)
+
+
+def test_candles_null_per_trade_features():
+    trades = make_trades(3, 50)
+    for trade in trades:
+        trade['Candle'] = True
+
+    result = FeatureEngine(list(FEATURES)).compute(trades, LAUNCH, SUPPLY)
+
+    assert result['price_source'] == 'candles'
+    per_trade = [name for name, cls in FEATURES.items() if cls.per_trade]
+    assert per_trade
+    assert result['unique_traders'] is None
+    assert result['peak_price'] is not None
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+import config
+from registry import WindowRegistry
+
+DAY = datetime(2025, 1, 1)
+
+
+def at(hour, minute=0):
+    return DAY + timedelta(hours=hour, minutes=minute)
+
+
+def test_everything_uncovered_at_first(tmp_path):
+    registry = WindowRegistry(str(tmp_path / 'registry.db'))
+    assert registry.uncovered(at(0), at(6)) == [(at(0), at(6))]
+
+
+def test_gaps_between_recorded_ranges(tmp_path):
+    registry = WindowRegistry(str(tmp_path / 'registry.db'))
+    registry.record([(at(1), at(2)), (at(3), at(4))], [])
+
+    assert registry.uncovered(at(0), at(6)) == [(at(0), at(1)), (at(2), at(3)), (at(4), at(6))]
+    assert registry.uncovered(at(1, 15), at(1, 45)) == []
+    assert registry.uncovered(at(1, 30), at(3, 30)) == [(at(2), at(3))]
+
+
+def test_overlapping_ranges_merge(tmp_path):
+    registry = WindowRegistry(str(tmp_path / 'registry.db'))
+    registry.record([(at(0), at(3))], [])
+    registry.record([(at(2), at(5))], [])
+
+    assert registry.uncovered(at(0), at(6)) == [(at(5), at(6))]
+
+
+def test_aware_datetimes_come_back_aware(tmp_path):
+    registry = WindowRegistry(str(tmp_path / 'registry.db'))
+    start = at(0).replace(tzinfo=timezone.utc)
+    end = at(2).replace(tzinfo=timezone.utc)
+    registry.record([(start, at(1))], [])
+
+    assert registry.uncovered(start, end) == [(at(1).replace(tzinfo=timezone.utc), end)]
+
+
+def test_coverage_is_per_config(tmp_path, monkeypatch):
+    registry = WindowRegistry(str(tmp_path / 'registry.db'))
+    registry.record([(at(0), at(6))], [])
+    assert registry.uncovered(at(0), at(6)) == []
+
+    monkeypatch.setitem(config.ANALYSIS_WINDOW, 'tracking_duration_hours',
+                        config.ANALYSIS_WINDOW['tracking_duration_hours'] + 1)
+    assert registry.uncovered(at(0), at(6)) == [(at(0), at(6))]
+
+
+def test_open_tracking_windows_stay_uncovered(tmp_path):
+    registry = WindowRegistry(str(tmp_path / 'registry.db'))
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    start = now - timedelta(days=2)
+    registry.record([(start, now)], [{'token_address': 'recent', 'launch_time': now.isoformat()}])
+
+    gaps = registry.uncovered(start, now)
+    hours = config.ANALYSIS_WINDOW['tracking_duration_hours']
+    assert len(gaps) == 1 and gaps[0][1] == now
+    assert gaps[0][0] >= now - timedelta(hours=hours, minutes=1)
+    assert registry.enriched_in(start, now) == []
@@ -0,0 +1,77 @@
+import config
+from rollups import RollupStore, token_metrics
+
+HOUR = 1735732800       # 2025-01-01 12:00 UTC
+DAY = 1735689600        # 2025-01-01 00:00 UTC
+
+
+def token(address, category, launch_time='2025-01-01T12:30:00Z', flags=(), roi=5, peak_mc=50_000):
+    return {
+        'token_address': address,
+        'launch_time': launch_time,
+        'category': category,
+        'failure_flags': list(flags),
+        'roi_from_entry_end': roi,
+        'peak_mc': peak_mc,
+    }
+
+
+def test_ingest_counts_hour_and_day(tmp_path):
+    store = RollupStore(str(tmp_path / 'rollups.db'))
+    store.ingest([token('a', 'successful'), token('b', 'rug_pull', flags=['rug_pull'])])
+
+    hour = store.series('hour', '2025-01-01T00:00:00Z', '2025-01-01T23:59:59Z')
+    day = store.series('day', '2025-01-01T00:00:00Z', '2025-01-01T23:59:59Z')
+    assert list(hour) == [HOUR]
+    assert hour[HOUR]['enriched'] == 2
+    assert hour[HOUR]['category:successful'] == 1
+    assert hour[HOUR]['flag:rug_pull'] == 1
+    assert day[DAY] == hour[HOUR]
+
+
+def test_reingest_swaps_the_old_contribution(tmp_path):
+    store = RollupStore(str(tmp_path / 'rollups.db'))
+    store.ingest([token('a', 'successful'), token('b', 'rug_pull', flags=['rug_pull'])])
+    # Re-running the window re-classifies b and moves a to another hour
+    store.ingest([token('b', 'successful'), token('a', 'successful', launch_time='2025-01-01T15:10:00Z')])
+
+    hour = store.series('hour', '2025-01-01T00:00:00Z', '2025-01-01T23:59:59Z')
+    assert hour[HOUR]['enriched'] == 1
+    assert hour[HOUR]['category:successful'] == 1
+    assert 'flag:rug_pull' not in hour[HOUR]
+    assert 'category:rug_pull' not in hour[HOUR]
+    assert hour[HOUR + 3 * 3600]['enriched'] == 1
+
+    day = store.series('day', '2025-01-01T00:00:00Z', '2025-01-01T23:59:59Z')
+    assert day[DAY]['enriched'] == 2
+    assert day[DAY]['category:successful'] == 2
+
+
+def test_same_run_twice_counts_once(tmp_path):
+    store = RollupStore(str(tmp_path / 'rollups.db'))
+    tokens = [token('a', 'successful'), token('b', 'pump_and_dump')]
+    store.ingest(tokens)
+    before = store.series('day', '2025-01-01T00:00:00Z', '2025-01-01T23:59:59Z')
+    store.ingest(tokens)
+
+    assert store.series('day', '2025-01-01T00:00:00Z', '2025-01-01T23:59:59Z') == before
+
+
+def test_profile_by_hour_of_day(tmp_path):
+    store = RollupStore(str(tmp_path / 'rollups.db'))
+    store.ingest([
+        token('a', 'successful'),
+        token('b', 'successful', launch_time='2025-01-02T12:05:00Z'),
+        token('c', 'rug_pull', launch_time='2025-01-02T03:00:00Z'),
+    ])
+
+    profile = store.profile('hour', '2025-01-01T00:00:00Z', '2025-01-02T23:59:59Z')
+    assert profile[12]['enriched'] == 2
+    assert profile[3]['category:rug_pull'] == 1
+
+
+def test_metric_names():
+    metrics = token_metrics(token('a', 'successful', flags=['dev_dump']))
+    assert metrics[:3] == ['enriched', 'category:successful', 'flag:dev_dump']
+    assert metrics[3].startswith('roi:') and metrics[4].startswith('peak_mc:')
+    assert config.ROLLUP_CONFIG['roi_buckets']
@@ -0,0 +1,106 @@
+from datetime import date
+
+import pytest
+
+import config
+import workqueue
+from workqueue import WorkQueue
+
+PRESET = "Full Day (00:00-23:59 UTC)"
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'))
+    queue.enqueue_range(date(2025, 1, 1), date(2025, 1, 1), PRESET, 12)
+    return queue
+
+
+def test_enqueue_skips_queued_slices(queue):
+    assert queue.enqueue_range(date(2025, 1, 1), date(2025, 1, 2), PRESET, 12) == 2
+    assert queue.status()['tasks'] == {'pending': 4}
+
+
+def test_expired_lease_is_reclaimed(queue, monkeypatch):
+    monkeypatch.setitem(config.WORK_QUEUE_CONFIG, 'lease_seconds', -1)
+    first = queue.lease('a')
+
+    # Another worker takes the expired task back; the stale worker's lease is gone
+    monkeypatch.setitem(config.WORK_QUEUE_CONFIG, 'lease_seconds', 60)
+    second = queue.lease('b')
+    assert second['id'] == first['id']
+    assert second['attempts'] == first['attempts'] + 1
+    assert not queue.heartbeat(first['id'], 'a')
+    assert not queue.complete(first['id'], 'a', [])
+    assert queue.complete(second['id'], 'b', [])
+
+
+def test_expired_lease_fails_after_max_attempts(queue, monkeypatch):
+    monkeypatch.setitem(config.WORK_QUEUE_CONFIG, 'lease_seconds', -1)
+    monkeypatch.setitem(config.WORK_QUEUE_CONFIG, 'max_attempts', 2)
+    task = queue.lease('a')
+    queue.lease('b')
+    queue.lease('c')
+
+    status = queue.status()
+    assert status['tasks']['failed'] == 1
+    assert status['failed_dates'] == ['2025-01-01']
+    assert queue.retry_failed() == 1
+    assert queue.status()['failed_dates'] == []
+    assert task['date'] == '2025-01-01'
+
+
+def finish_all(queue, tokens_by_slice):
+    for tokens in tokens_by_slice:
+        task = queue.lease('w')
+        assert queue.complete(task['id'], 'w', tokens)
+
+
+def token(address, launch_time):
+    return {'token_address': address, 'launch_time': launch_time}
+
+
+def test_merge_waits_for_every_slice_and_runs_once(queue):
+    task = queue.lease('w')
+    queue.complete(task['id'], 'w', [token('a', '2025-01-01T01:00:00Z')])
+    assert queue.claim_merge('2025-01-01', 'w') is None
+
+    task = queue.lease('w')
+    queue.complete(task['id'], 'w', [token('b', '2025-01-01T13:00:00Z'), token('a', '2025-01-01T01:00:00Z')])
+
+    window_start, window_end, tokens = queue.claim_merge('2025-01-01', 'w1')
+    assert [t['token_address'] for t in tokens] == ['a', 'b']
+    assert window_start.hour == 0 and window_end.hour == 23
+    assert queue.claim_merge('2025-01-01', 'w2') is None
+    assert queue.status()['merged_dates'] == 1
+
+
+class Processor:
+    """Records what merge_date hands to the processor"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.saved = []
+        self.trade_series = {'x': []}
+
+    def finalize(self, tokens, start, end):
+        return tokens, [], {'total_tokens_analyzed': len(tokens)}
+
+    def save_to_json_files(self, successful, failed, summary, date_label):
+        if self.fail:
+            raise OSError("disk full")
+        self.saved.append((date_label, len(successful)))
+        return date_label
+
+
+def test_failed_save_releases_the_merge(queue):
+    finish_all(queue, [[token('a', '2025-01-01T01:00:00Z')], []])
+
+    with pytest.raises(OSError):
+        workqueue.merge_date(queue, '2025-01-01', Processor(fail=True), 'w1')
+
+    processor = Processor()
+    assert workqueue.merge_date(queue, '2025-01-01', processor, 'w2') == '2025-01-01'
+    assert processor.saved == [('2025-01-01', 1)]
+    assert processor.trade_series == {}
+    assert workqueue.merge_date(queue, '2025-01-01', Processor(), 'w3') is None
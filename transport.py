@@ -0,0 +1,173 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Transport - HTTP layer under BitqueryClient with record and replay
+Recordings are content-addressed: every response body is gzipped once
+under blobs/<sha256> and index.jsonl lists each exchange in order
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+import config
+
+
+class Response:
+    """Minimal stand-in for requests.Response used during replay"""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def request_key(method, url, params=None, json_body=None):
+    """Stable hash of a request (headers, and so the API key, are excluded)"""
+    canonical = json.dumps(
+        {"method": method.upper(), "url": url, "params": params, "json": json_body},
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class HttpTransport:
+    """Live network transport"""
+
+    def request(self, method, url, **kwargs):
+        return requests.request(method, url, **kwargs)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def close(self):
+        pass
+
+
+class RecordingTransport:
+    """Passes requests to another transport and archives every exchange"""
+
+    def __init__(self, archive_dir, inner=None):
+        self.archive_dir = archive_dir
+        self.inner = inner or HttpTransport()
+        self._lock = threading.Lock()
+        self._blobs = set()
+
+        os.makedirs(os.path.join(archive_dir, 'blobs'), exist_ok=True)
+        self._index = open(os.path.join(archive_dir, 'index.jsonl'), 'a')
+        print(f"🎙️ Recording API exchanges to {archive_dir}")
+
+    def request(self, method, url, **kwargs):
+        key = request_key(method, url, kwargs.get('params'), kwargs.get('json'))
+        started = time.perf_counter()
+
+        try:
+            response = self.inner.request(method, url, **kwargs)
+        except requests.RequestException as e:
+            self._append({"key": key, "error": str(e), "elapsed": time.perf_counter() - started})
+            raise
+
+        elapsed = time.perf_counter() - started
+        blob = self._store_blob(response.content)
+        self._append({"key": key, "status": response.status_code, "blob": blob, "elapsed": elapsed})
+        return response
+
+    def _store_blob(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            if digest in self._blobs:
+                return digest
+            self._blobs.add(digest)
+
+        path = os.path.join(self.archive_dir, 'blobs', digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return digest
+
+    def _append(self, entry):
+        with self._lock:
+            self._index.write(json.dumps(entry) + "\n")
+            self._index.flush()
+
+    def sleep(self, seconds):
+        self.inner.sleep(seconds)
+
+    def close(self):
+        with self._lock:
+            if not self._index.closed:
+                self._index.close()
+
+
+class ReplayTransport:
+    """
+    Serves a recording offline
+    speed: 0 = as fast as possible, 1 = recorded latency, N = N times faster
+    """
+
+    def __init__(self, archive_dir, speed=0):
+        self.archive_dir = archive_dir
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._exchanges = {}        # request key -> recorded exchanges in order
+        self._cursor = {}           # request key -> next exchange to serve
+
+        with open(os.path.join(archive_dir, 'index.jsonl'), 'r') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._exchanges.setdefault(entry['key'], []).append(entry)
+
+        print(f"▶️ Replaying {sum(len(v) for v in self._exchanges.values())} API exchanges from {archive_dir}")
+
+    def request(self, method, url, **kwargs):
+        key = request_key(method, url, kwargs.get('params'), kwargs.get('json'))
+
+        with self._lock:
+            exchanges = self._exchanges.get(key)
+            if not exchanges:
+                return Response(404, b'{"error": "request not in recording"}')
+            # Repeated requests replay in recorded order; the last one repeats
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = min(position + 1, len(exchanges) - 1)
+            entry = exchanges[position]
+
+        self.sleep(entry.get('elapsed', 0))
+
+        if 'error' in entry:
+            raise requests.ConnectionError(entry['error'])
+        return Response(entry['status'], self._read_blob(entry['blob']))
+
+    def _read_blob(self, digest):
+        with gzip.open(os.path.join(self.archive_dir, 'blobs', digest), 'rb') as f:
+            return f.read()
+
+    def sleep(self, seconds):
+        if self.speed and seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def close(self):
+        pass
+
+
+def build_transport():
+    """Create the transport selected in config.TRANSPORT_CONFIG"""
+    cfg = config.TRANSPORT_CONFIG
+    mode = cfg['mode']
+
+    if mode == 'record':
+        return RecordingTransport(cfg['archive_dir'])
+    if mode == 'replay':
+        return ReplayTransport(cfg['archive_dir'], cfg['replay_speed'])
+    return HttpTransport()
@@ -0,0 +1,390 @@
+"""
+بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ
+Work Queue - Durable SQLite task queue for distributed backfills
+Date ranges are split into (date, time-slice) tasks. Workers on any
+machine that can reach the queue file (shared disk) lease tasks, send
+heartbeats and hand back enriched tokens; expired leases are reclaimed.
+When every slice of a date is done its results are merged and saved.
+Slices whose run hit failed requests or the API budget are failed (and
+retried) instead of completed, so an outage never merges as an empty date.
+
+Usage:
+    python workqueue.py enqueue --from 2025-01-01 --to 2025-01-31 --preset "Full Day (00:00-23:59 UTC)" --slice-hours 2
+    python workqueue.py work            # BITQUERY_API_TOKEN from env / .env
+    python workqueue.py status
+    python workqueue.py retry           # Failed slices back to pending
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+import config
+
+# Incomplete-run reasons that a later attempt can fix (see TokenProcessor.incomplete)
+RETRYABLE = ('failed_requests', 'over_budget')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    slice_start TEXT NOT NULL,
+    slice_end TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated_at REAL,
+    UNIQUE (date, slice_start, slice_end)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks (date, status);
+
+CREATE TABLE IF NOT EXISTS merges (
+    date TEXT PRIMARY KEY,
+    merged INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    updated_at REAL
+);
+"""
+
+
+class WorkQueue:
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.WORK_QUEUE_CONFIG['db_path']
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """
+        Autocommit connection using a rollback journal (not WAL),
+        so SQLite's file locking also works on shared disks
+        """
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=DELETE")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Exclusive write transaction"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    # ----- Producer -----
+
+    def enqueue_range(self, start_date, end_date, preset_name, slice_hours=None):
+        """
+        One task per (date, slice) of a TIME_RANGE_PRESETS window
+        slice_hours splits the window further; already queued slices are skipped
+        """
+        preset = config.TIME_RANGE_PRESETS[preset_name]
+        if not preset['start']:
+            raise ValueError(f"Preset '{preset_name}' has no fixed time range")
+
+        slice_hours = slice_hours or config.WORK_QUEUE_CONFIG['slice_hours']
+        day_start = datetime.strptime(preset['start'], "%H:%M:%S").time()
+        day_end = datetime.strptime(preset['end'], "%H:%M:%S").time()
+
+        rows = []
+        day = start_date
+        while day <= end_date:
+            window_start = datetime.combine(day, day_start)
+            window_end = datetime.combine(day, day_end)
+            slice_start = window_start
+            while slice_start < window_end:
+                slice_end = min(slice_start + timedelta(hours=slice_hours), window_end)
+                rows.append((
+                    day.strftime(config.DATE_FORMAT),
+                    slice_start.strftime(config.DATETIME_FORMAT),
+                    slice_end.strftime(config.DATETIME_FORMAT),
+                    time.time()
+                ))
+                slice_start = slice_end
+            day += timedelta(days=1)
+
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (date, slice_start, slice_end, updated_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            return conn.total_changes - before
+
+    # ----- Workers -----
+
+    def lease(self, worker_id):
+        """Claim the next pending task (reclaiming expired leases first)"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._reclaim(conn, now)
+            row = conn.execute(
+                "SELECT * FROM tasks WHERE status = 'pending' ORDER BY date, slice_start LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + config.WORK_QUEUE_CONFIG['lease_seconds'], now, row['id'])
+            )
+            return dict(row)
+
+    def _reclaim(self, conn, now):
+        """Expired leases go back to pending, or fail after max_attempts"""
+        conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, error = 'lease expired', updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (config.WORK_QUEUE_CONFIG['max_attempts'], now, now)
+        )
+
+    def heartbeat(self, task_id, worker_id):
+        """Extend the lease; False if this worker no longer owns the task"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (now + config.WORK_QUEUE_CONFIG['lease_seconds'], now, task_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, worker_id, enriched_tokens):
+        """Store the slice's enriched tokens; False if the lease was lost"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(enriched_tokens, default=str), time.time(), task_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task_id, worker_id, error):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, error = ?, updated_at = ? WHERE id = ? AND worker = ?",
+                (config.WORK_QUEUE_CONFIG['max_attempts'], str(error), time.time(), task_id, worker_id)
+            )
+
+    # ----- Results -----
+
+    def claim_merge(self, date_label, worker_id):
+        """
+        (window_start, window_end, enriched_tokens) once every slice of the date
+        is done and this worker won the merge, otherwise None
+        The merged flag is taken in the same transaction that sees the date
+        drained, so only one worker merges and saves a date
+        """
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT slice_start, slice_end, status, result FROM tasks WHERE date = ? ORDER BY slice_start",
+                (date_label,)
+            ).fetchall()
+            if not rows or any(row['status'] != 'done' for row in rows):
+                return None
+
+            conn.execute("INSERT OR IGNORE INTO merges (date) VALUES (?)", (date_label,))
+            cursor = conn.execute(
+                "UPDATE merges SET merged = 1, worker = ?, updated_at = ? WHERE date = ? AND merged = 0",
+                (worker_id, time.time(), date_label)
+            )
+            if cursor.rowcount != 1:
+                return None
+
+        enriched = {}
+        for row in rows:
+            for token in json.loads(row['result'] or '[]'):
+                enriched[token['token_address']] = token
+
+        window_start = datetime.strptime(rows[0]['slice_start'], config.DATETIME_FORMAT)
+        window_end = datetime.strptime(rows[-1]['slice_end'], config.DATETIME_FORMAT)
+        tokens = sorted(enriched.values(), key=lambda t: t['launch_time'])
+        return window_start, window_end, tokens
+
+    def release_merge(self, date_label, worker_id):
+        """Give back a merge claim whose save failed, so another worker can retry"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE merges SET merged = 0, worker = NULL, updated_at = ? WHERE date = ? AND worker = ?",
+                (time.time(), date_label, worker_id)
+            )
+
+    def status(self):
+        """Task counts by status, plus dates that merged and dates held back by failed slices"""
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+            failed = conn.execute(
+                "SELECT DISTINCT date FROM tasks WHERE status = 'failed' ORDER BY date"
+            ).fetchall()
+            merged = conn.execute("SELECT COUNT(*) AS n FROM merges WHERE merged = 1").fetchone()
+        return {
+            'tasks': {row['status']: row['n'] for row in rows},
+            'merged_dates': merged['n'],
+            'failed_dates': [row['date'] for row in failed],
+        }
+
+    def retry_failed(self):
+        """Failed slices back to pending with fresh attempts; returns how many"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, worker = NULL, updated_at = ? "
+                "WHERE status = 'failed'",
+                (time.time(),)
+            )
+            return cursor.rowcount
+
+
+def run_worker(api_token, queue=None, worker_id=None, stop_when_empty=True):
+    """Lease, process and hand back tasks until the queue is drained"""
+    from bitquery_client import BitqueryClient
+    from processor import TokenProcessor
+
+    queue = queue or WorkQueue()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    print(f"👷 Worker {worker_id} started")
+
+    while True:
+        task = queue.lease(worker_id)
+        if task is None:
+            status = queue.status()
+            counts = status['tasks']
+            if stop_when_empty and not counts.get('pending') and not counts.get('leased'):
+                print("✅ Queue drained")
+                if status['failed_dates']:
+                    print(f"⚠️ Not merged, slices failed: {', '.join(status['failed_dates'])} "
+                          f"(python workqueue.py retry)")
+                return
+            time.sleep(config.WORK_QUEUE_CONFIG['poll_seconds'])
+            continue
+
+        print(f"📦 Task {task['id']}: {task['slice_start']} to {task['slice_end']}")
+
+        # Keep the lease alive while the slice is processed
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(config.WORK_QUEUE_CONFIG['lease_seconds'] / 3):
+                if not queue.heartbeat(task['id'], worker_id):
+                    print(f"⚠️ Lost lease on task {task['id']}")
+                    return
+
+        heartbeat_thread = threading.Thread(target=beat, daemon=True)
+        heartbeat_thread.start()
+
+        bitquery = None
+        try:
+            bitquery = BitqueryClient(api_token)
+            processor = TokenProcessor(bitquery)
+            processor.process_tokens_for_timerange(
+                datetime.strptime(task['slice_start'], config.DATETIME_FORMAT),
+                datetime.strptime(task['slice_end'], config.DATETIME_FORMAT)
+            )
+            retry = [reason for reason in processor.incomplete if reason in RETRYABLE]
+            if retry:
+                # An outage or quota hit is not an empty slice
+                print(f"⚠️ Task {task['id']} incomplete ({', '.join(retry)}), handing it back")
+                queue.fail(task['id'], worker_id, f"incomplete run: {', '.join(retry)}")
+                completed = False
+            else:
+                completed = queue.complete(task['id'], worker_id, processor.enriched_tokens)
+        except Exception as e:
+            print(f"❌ Task {task['id']} failed: {e}")
+            queue.fail(task['id'], worker_id, e)
+            completed = False
+        finally:
+            if bitquery is not None:
+                bitquery.close()    # Finishes a recording
+            done.set()
+            heartbeat_thread.join()
+
+        if completed:
+            merge_date(queue, task['date'], processor, worker_id)
+
+
+def merge_date(queue, date_label, processor, worker_id):
+    """Save a date's merged results once all of its slices are done (one worker per date)"""
+    merged = queue.claim_merge(date_label, worker_id)
+    if merged is None:
+        return None
+
+    window_start, window_end, enriched_tokens = merged
+    print(f"🧩 Merging {len(enriched_tokens)} tokens for {date_label}")
+    try:
+        successful, failed, summary = processor.finalize(enriched_tokens, window_start, window_end)
+        processor.trade_series = {}         # Only the last slice's trades are in memory
+        return processor.save_to_json_files(successful, failed, summary, date_label)
+    except Exception:
+        queue.release_merge(date_label, worker_id)
+        raise
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Distributed backfill work queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="Queue (date, time-slice) tasks")
+    enqueue.add_argument("--from", dest="start", required=True, help="YYYY-MM-DD")
+    enqueue.add_argument("--to", dest="end", required=True, help="YYYY-MM-DD")
+    enqueue.add_argument("--preset", default="Full Day (00:00-23:59 UTC)", choices=[
+        name for name, preset in config.TIME_RANGE_PRESETS.items() if preset['start']
+    ])
+    enqueue.add_argument("--slice-hours", type=float, default=None)
+
+    work = sub.add_parser("work", help="Process tasks until the queue is drained")
+    work.add_argument("--token", default=os.getenv("BITQUERY_API_TOKEN"))
+    work.add_argument("--forever", action="store_true", help="Keep polling for new tasks")
+
+    sub.add_parser("status", help="Task counts by status and failed dates")
+    sub.add_parser("retry", help="Put failed slices back in the queue")
+
+    args = parser.parse_args()
+    queue = WorkQueue()
+
+    if args.command == "enqueue":
+        added = queue.enqueue_range(
+            datetime.strptime(args.start, config.DATE_FORMAT).date(),
+            datetime.strptime(args.end, config.DATE_FORMAT).date(),
+            args.preset,
+            args.slice_hours
+        )
+        print(f"📥 Queued {added} tasks")
+    elif args.command == "work":
+        if not args.token:
+            parser.error("Bitquery API token required (--token or BITQUERY_API_TOKEN)")
+        run_worker(args.token, queue, stop_when_empty=not args.forever)
+    elif args.command == "retry":
+        print(f"🔁 Requeued {queue.retry_failed()} failed tasks")
+    else:
+        print(json.dumps(queue.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()